@@ -0,0 +1,121 @@
+"""
+Compares routing guild messages by channel name with the channel ID lookup
+
+Run as: uv run python benchmarks/dispatch.py
+
+The routing by name mimics what on_message used to do before deciding
+a message needs no work: the checks of author and message type, a log line,
+and the chain of channel names.
+"""
+
+import io
+import logging
+import random
+import timeit
+
+from jg.chick.lib.routing import ChannelRoutes
+
+
+ROUTED_CHANNELS_NAMES = ["ahoj", "past-vedle-pasti", "můj-dnešní-objev"]
+
+OTHER_CHANNELS_NAMES = [
+    "off-topic",
+    "python",
+    "javascript",
+    "kurzy",
+    "práce-a-kariéra",
+    "pomoc",
+    "oznámení",
+    "random",
+]
+
+
+class Channel:
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+
+class Author:
+    id = 1
+
+
+class Message:
+    def __init__(self, channel: Channel):
+        self.channel = channel
+        self.author = Author()
+        self.guild = object()
+
+    def is_system(self) -> bool:
+        return False
+
+
+logger = logging.getLogger("jg.chick.benchmarks")
+
+
+class Guild:
+    def __init__(self, channels: list[Channel]):
+        self.channels = channels
+
+
+async def handle(message: Message) -> None:
+    pass
+
+
+def generate_messages(
+    channels: list[Channel], size: int, seed: int = 42
+) -> list[Message]:
+    rng = random.Random(seed)
+    # routed channels get only a small share of the traffic
+    weights = [1 if c.name in ROUTED_CHANNELS_NAMES else 10 for c in channels]
+    return [Message(c) for c in rng.choices(channels, weights, k=size)]
+
+
+def route_by_name(message: Message):
+    if message.author.id == 0:
+        return None
+    if message.is_system():
+        return None
+    if message.guild is None:
+        return None
+    if getattr(message.channel, "parent", None):
+        return None
+    logger.info("Processing regular message")
+    channel = message.channel
+    if channel.name == "ahoj":
+        return handle
+    if channel.name == "past-vedle-pasti":
+        return handle
+    if channel.name == "můj-dnešní-objev":
+        return handle
+    return None
+
+
+def main() -> None:
+    logger.addHandler(logging.StreamHandler(io.StringIO()))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    channels = [
+        Channel(id, name)
+        for id, name in enumerate(ROUTED_CHANNELS_NAMES + OTHER_CHANNELS_NAMES)
+    ]
+    routes = ChannelRoutes()
+    for name in ROUTED_CHANNELS_NAMES:
+        routes.route(name)(handle)
+    routes.index_guild(Guild(channels))  # type: ignore
+    messages = generate_messages(channels, 100_000)
+    print(f"Messages: {len(messages)}")
+
+    for name, fn in [
+        ("channel name", lambda: [route_by_name(m) for m in messages]),
+        ("channel ID", lambda: [routes.get(m.channel.id) for m in messages]),
+    ]:
+        seconds = min(timeit.repeat(fn, number=1, repeat=5))
+        print(
+            f"{name:>12}: {seconds * 1000:8.1f} ms, {seconds / len(messages) * 1e9:6.1f} ns/message"
+        )
+
+
+if __name__ == "__main__":
+    main()
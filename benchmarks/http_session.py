@@ -0,0 +1,59 @@
+"""
+Compares a new aiohttp session per request with the shared session
+
+Run as: uv run python benchmarks/http_session.py
+
+The stand-in server runs locally over plain HTTP, so the numbers only show
+the cost of a new connector and connection. Real requests over the internet
+also save a DNS lookup and a TLS handshake each.
+"""
+
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from jg.chick.lib import http
+
+
+REQUESTS = 500
+
+
+async def profiles_json(request: web.Request) -> web.Response:
+    return web.json_response({"items": [{"github_username": "honzajavorek"}]})
+
+
+async def measure(name: str, url: str, get) -> None:
+    started_at = time.perf_counter()
+    for _ in range(REQUESTS):
+        await get(url)
+    seconds = time.perf_counter() - started_at
+    print(f"{name:>22}: {seconds / REQUESTS * 1e3:6.2f} ms/request")
+
+
+async def main() -> None:
+    app = web.Application()
+    app.router.add_get("/profiles.json", profiles_json)
+    async with TestServer(app) as server:
+        url = str(server.make_url("/profiles.json"))
+
+        async def get_with_new_session(url: str) -> None:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as resp:
+                    await resp.json()
+
+        await measure("new session per request", url, get_with_new_session)
+
+        async with http.create_session() as shared_session:
+
+            async def get_with_shared_session(url: str) -> None:
+                async with shared_session.get(url) as resp:
+                    await resp.json()
+
+            await measure("shared session", url, get_with_shared_session)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
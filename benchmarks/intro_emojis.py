@@ -0,0 +1,64 @@
+"""
+Compares choosing intro emojis pattern by pattern with the keyword pre-filter
+
+Run as: uv run python benchmarks/intro_emojis.py
+"""
+
+import random
+import timeit
+
+from jg.chick.lib.intro import (
+    PATTERNS_EMOJIS_MAPPING,
+    choose_intro_emojis,
+)
+
+
+SENTENCES = [
+    "Ahoj, jmenuji se Jana a pracuji jako účetní v malé firmě v Brně.",
+    "Programování mě láká už delší dobu, ale teprve letos jsem se odhodlala.",
+    "Začala jsem s Pythonem, prošla jsem kurz od Czechitas a teď zkouším SQL.",
+    "V práci dělám hodně v Excelu a Power BI, takže mě baví datová analýza.",
+    "Frontend mě moc neláká, ale HTML a CSS znám ze střední školy.",
+    "Manžel dělá v Javě, občas mi ukazuje Spring, ale moc tomu nerozumím.",
+    "Mám dvě děti, takže na učení mám hlavně večery a víkendy.",
+    "Ráda bych si do roka našla první práci v IT, klidně i jako testerka.",
+    "Můj GitHub je https://github.com/jana-example, zatím tam moc není.",
+    "Zkoušela jsem i JavaScript a React, ale to mi přišlo jako moc velké sousto.",
+    "Díky za každou radu, hlavně jak si poskládat portfolio projektů.",
+    "Nejvíc mě zatím baví pandas a vizualizace dat v Jupyter noteboocích.",
+]
+
+
+def generate_corpus(size: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(SENTENCES, k=rng.randint(6, 20))) for _ in range(size)]
+
+
+def choose_intro_emojis_by_every_pattern(intro_message_content: str) -> list[str]:
+    emojis = set()
+    for pattern_re, pattern_emojis in PATTERNS_EMOJIS_MAPPING.items():
+        if pattern_re.search(intro_message_content):
+            emojis.update(pattern_emojis)
+    return ["👋", "🐣", "👍"] + list(emojis)
+
+
+def main() -> None:
+    corpus = generate_corpus(5_000)
+    average_length = sum(map(len, corpus)) // len(corpus)
+    print(f"Corpus: {len(corpus)} intros, {average_length} characters on average")
+
+    for name, fn in [
+        (
+            "every pattern",
+            lambda: [choose_intro_emojis_by_every_pattern(c) for c in corpus],
+        ),
+        ("keyword pre-filter", lambda: [choose_intro_emojis(c) for c in corpus]),
+    ]:
+        seconds = min(timeit.repeat(fn, number=1, repeat=5))
+        print(
+            f"{name:>26}: {seconds * 1000:8.1f} ms, {seconds / len(corpus) * 1e6:6.1f} µs/intro"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares building the intro message on every call with the prepared payloads
+
+Run as: uv run python benchmarks/intro_message.py
+"""
+
+import asyncio
+import timeit
+import tracemalloc
+from textwrap import dedent
+
+from discord import ButtonStyle, ui
+
+from jg.chick.lib.intro import (
+    INTRO_FOOTER,
+    INTRO_GITHUB_SNIPPET,
+    INTRO_GREETING,
+    INTRO_TIPS,
+    generate_intro_message,
+)
+
+
+INTRO = "Ahoj, jsem Jana, učím se Python a můj GitHub je https://github.com/jana/"
+
+CALLS = 10_000
+
+
+def build_intro_message(intro_message_content: str) -> dict:
+    content = INTRO_GREETING
+    if "github.com/" in intro_message_content:
+        content = content + INTRO_GITHUB_SNIPPET
+    content = dedent(content + INTRO_TIPS + INTRO_FOOTER)
+    view = ui.View(
+        ui.Button(
+            emoji="📖",
+            label="Příručka",
+            url="https://junior.guru/handbook/",
+            style=ButtonStyle.secondary,
+        ),
+        ui.Button(
+            emoji="💌",
+            label="Newsletter",
+            url="https://junior.guru/news/",
+            style=ButtonStyle.secondary,
+        ),
+    )
+    return dict(content=content, view=view)
+
+
+def measure(name: str, fn) -> None:
+    fn(INTRO)  # warm up
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    payloads = [fn(INTRO) for _ in range(CALLS)]
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff
+        for stat in snapshot_after.compare_to(snapshot_before, "filename")
+        if stat.size_diff > 0
+    )
+    del payloads
+    seconds = min(timeit.repeat(lambda: fn(INTRO), number=CALLS, repeat=3))
+    print(
+        f"{name:>10}: {seconds / CALLS * 1e6:6.1f} µs/intro, "
+        f"{allocated / CALLS:8.1f} B retained/intro"
+    )
+
+
+async def main() -> None:
+    measure("rebuilt", build_intro_message)
+    measure("prepared", generate_intro_message)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+"""
+Measures memory of the Discord caches on a synthetic large guild
+
+Run as: uv run python benchmarks/memory.py
+
+Each cache policy gets measured in a separate process, which feeds the bot's
+connection state a guild with many members and a stream of messages, and
+reports how much its RSS grew. Members come in chunks only if the policy
+chunks guilds, otherwise the bot gets to know only the members who send
+messages.
+"""
+
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+from itertools import product
+from pathlib import Path
+
+
+MEMBERS_COUNT = 50_000
+
+ROLES_COUNT = 50
+
+CHANNELS_COUNT = 50
+
+MESSAGES_COUNT = 20_000
+
+CHUNK_SIZE = 1000
+
+GUILD_ID = 1
+
+MEMBER_ID_OFFSET = 1_000_000
+
+
+def generate_guild() -> dict:
+    return {
+        "id": str(GUILD_ID),
+        "name": "Synthetic",
+        "member_count": MEMBERS_COUNT,
+        "large": True,
+        "roles": [
+            {
+                "id": str(GUILD_ID + role_id),
+                "name": f"role {role_id}",
+                "position": role_id,
+                "color": 0,
+                "colors": {"primary_color": 0},
+                "permissions": "0",
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }
+            for role_id in range(ROLES_COUNT)
+        ],
+        "channels": [
+            {
+                "id": str(channel_id),
+                "type": 0,
+                "name": f"channel-{channel_id}",
+                "position": channel_id,
+            }
+            for channel_id in range(100, 100 + CHANNELS_COUNT)
+        ],
+    }
+
+
+def generate_member(n: int) -> dict:
+    return {
+        "user": {
+            "id": str(MEMBER_ID_OFFSET + n),
+            "username": f"member{n}",
+            "discriminator": "0",
+            "avatar": None,
+        },
+        "roles": [str(GUILD_ID + 1 + n % (ROLES_COUNT - 1))],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+    }
+
+
+def generate_message(n: int) -> dict:
+    member = generate_member(n * 7 % MEMBERS_COUNT)
+    return {
+        "id": str(10_000_000 + n),
+        "channel_id": str(100 + n % CHANNELS_COUNT),
+        "guild_id": str(GUILD_ID),
+        "author": member["user"],
+        "member": member,
+        "content": f"Message number {n} with some typical length of the content " * 3,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def get_rss() -> int:
+    # Linux only, as that's where the bot runs
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not found")
+
+
+async def measure(member_cache: bool, chunk_guilds: bool, max_messages: int) -> int:
+    import discord
+
+    from jg.chick.bot import create_bot
+
+    gc.collect()
+    rss = get_rss()
+    bot = create_bot(member_cache, chunk_guilds, max_messages)
+    state = bot._connection
+    state.dispatch = lambda *args, **kwargs: None  # no handlers should run
+    guild = discord.Guild(data=generate_guild(), state=state)
+    state._add_guild(guild)
+    if chunk_guilds:
+        # mimics how the library caches members from chunks of the gateway
+        for offset in range(0, MEMBERS_COUNT, CHUNK_SIZE):
+            members = [
+                discord.Member(data=generate_member(n), guild=guild, state=state)  # type: ignore
+                for n in range(offset, offset + CHUNK_SIZE)
+            ]
+            if state.member_cache_flags.joined:
+                for member in members:
+                    guild._add_member(member)
+    for n in range(MESSAGES_COUNT):
+        state.parse_message_create(generate_message(n))
+    bot.role_members.index_guild(guild)
+    gc.collect()
+    return get_rss() - rss
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        options = json.loads(sys.argv[1])
+        print(asyncio.run(measure(**options)))
+        return
+
+    print(
+        f"Guild: {MEMBERS_COUNT} members, {ROLES_COUNT} roles, "
+        f"{CHANNELS_COUNT} channels, {MESSAGES_COUNT} messages"
+    )
+    for member_cache, chunk_guilds, max_messages in product(
+        [True, False], [True, False], [1000, 100, 0]
+    ):
+        options = dict(
+            member_cache=member_cache,
+            chunk_guilds=chunk_guilds,
+            max_messages=max_messages,
+        )
+        output = subprocess.check_output(
+            [sys.executable, __file__, json.dumps(options)], text=True
+        )
+        rss_mb = int(output.splitlines()[-1]) / 1024 / 1024
+        print(
+            f"member cache: {member_cache!s:>5}, chunk guilds: {chunk_guilds!s:>5}, "
+            f"max messages: {max_messages:>4} → +{rss_mb:5.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
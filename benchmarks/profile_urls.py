@@ -0,0 +1,71 @@
+"""
+Compares scanning a review post once per kind of link with the single pass
+
+Run as: uv run python benchmarks/profile_urls.py
+"""
+
+import random
+import re
+import timeit
+from urllib.parse import quote, unquote
+
+from jg.chick.lib.profiles import extract_profile_urls, normalize_username
+
+
+GITHUB_URL_RE = re.compile(r"github\.com/(?P<username>[\w-]+)")
+
+LINKEDIN_URL_RE = re.compile(r"linkedin\.com/in/(?P<username>[^\s\/]+)")
+
+SENTENCES = [
+    "Ahoj, prosím o zpětnou vazbu na moje CV, GitHub a LinkedIn.",
+    "Rekvalifikoval jsem se z účetnictví, teď dělám projekty v Pythonu.",
+    "Portfolio mám na https://portfolio-example.netlify.app/, ještě není hotové.",
+    "GitHub: https://github.com/jan-example, hlavně repozitář s Flaskem.",
+    "Hlavní projekt je https://github.com/jan-example/eshop, mrkněte na README.",
+    "LinkedIn: https://www.linkedin.com/in/jan-example-68a441146/",
+    "Po úpravách znova www.linkedin.com/in/jan-example-68a441146",
+    "Dělal jsem i kurz od Czechitas, certifikát mám v příloze.",
+    "Budu rád za jakoukoliv radu, hlavně k popisu projektů.",
+    "Díky moc všem, kdo si na to najdou čas 🙂",
+]
+
+
+def generate_corpus(size: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choices(SENTENCES, k=rng.randint(20, 60))) for _ in range(size)
+    ]
+
+
+def extract_profile_urls_per_kind(text: str) -> tuple[list[str], list[str]]:
+    github_urls = {}
+    for match in GITHUB_URL_RE.finditer(text):
+        username = match.group("username")
+        github_urls.setdefault(
+            normalize_username(username), f"https://github.com/{username}/"
+        )
+    linkedin_urls = {}
+    for match in LINKEDIN_URL_RE.finditer(text):
+        username = quote(unquote(match.group("username")))
+        url = f"https://www.linkedin.com/in/{username}/"
+        linkedin_urls.setdefault(url.casefold(), url)
+    return list(github_urls.values()), list(linkedin_urls.values())
+
+
+def main() -> None:
+    corpus = generate_corpus(2_000)
+    average_length = sum(map(len, corpus)) // len(corpus)
+    print(f"Corpus: {len(corpus)} posts, {average_length} characters on average")
+
+    for name, fn in [
+        ("scan per kind", lambda: [extract_profile_urls_per_kind(c) for c in corpus]),
+        ("single pass", lambda: [extract_profile_urls(c) for c in corpus]),
+    ]:
+        seconds = min(timeit.repeat(fn, number=1, repeat=5))
+        print(
+            f"{name:>14}: {seconds * 1000:8.1f} ms, {seconds / len(corpus) * 1e6:6.1f} µs/post"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,56 @@
 import asyncio
 import logging
+import time
 from datetime import UTC, datetime
-from typing import cast
+from pathlib import Path
+from typing import Any, Awaitable, Callable, cast
 
 import aiohttp
 import discord
 from discord.ext import commands, tasks
-from jg.hen.core import check_profile_url
 
-from jg.chick.lib import interests
+from jg.chick.lib import http, interests
 from jg.chick.lib.intro import (
     GREETER_ROLE_ID,
     THREAD_NAME_TEMPLATE as INTRO_THREAD_NAME_TEMPLATE,
     choose_intro_emojis,
     generate_intro_message,
 )
+from jg.chick.lib.profiles import (
+    PROFILES_TTL,
+    ProfilesIndex,
+    ProfileURLs,
+    extract_profile_urls,
+)
 from jg.chick.lib.reviews import (
+    CV_REPLY_CONTENT,
     GITHUB_API_KEY,
+    GITHUB_DEFERRED_TEMPLATE,
+    GITHUB_REPLY_TEMPLATE,
+    LINKEDIN_REPLY_TEMPLATE,
+    QUEUE_FULL_CONTENT,
+    REVIEW_TAGS_NAMES,
     REVIEWER_ROLE_ID,
-    find_cv_url,
-    find_github_url,
-    find_linkedin_url,
+    ForumTagsIndex,
+    GitHubRateBudget,
+    GitHubRateLimited,
+    ReviewQueue,
+    SummariesCache,
+    find_missing_tags,
     format_summary,
+    is_recheck_requested,
+    pack_messages,
     prepare_tags,
+    review_github_profile,
 )
+from jg.chick.lib.roles import RoleMembersIndex
+from jg.chick.lib.routing import ChannelRoutes, Handler
 from jg.chick.lib.threads import (
+    BotMessages,
+    RolePings,
+    StartingMessagesCache,
+    ThreadMembersCache,
+    clear_bot_messages,
     ensure_thread_name,
     fetch_starting_message,
     get_missing_members,
@@ -34,7 +60,54 @@ from jg.chick.lib.threads import (
 )
 
 
-EGGTRAY_API_URL = "https://juniorguru.github.io/eggtray/profiles.json"
+INTEREST_NOTIFICATION_PURPOSE = "interest notification"
+
+HELP_CONTENT = "-# Píp píp píp! Všechno se dovíš v [dokumentaci na webu](https://junior.guru/about/bot/) 📖"
+
+DISCORD_ID_TEMPLATE = (
+    "-# Tvoje Discord ID je `{discord_id}`. "
+    "Až si budeš zakládat profil v [seznamu kandidátů](https://junior.guru/candidates/), "
+    "bude se ti tahle informace hodit <a:awkward:985064290044223488>"
+)
+
+UNFOLLOW_ERROR_CONTENT = (
+    "-# Píp, promiň, ale tenhle příkaz funguje jenom "
+    "v zájmových vláknech uvnitř <#1075087563645263922>. "
+    "Pokud už tě nebaví např. Python, jdi do jeho vlákna "
+    "a tam použij `/unfollow`."
+)
+
+UNFOLLOW_TEMPLATE = (
+    "-# Odhlásilo jsem tě z téhle zájmové skupinky. Odebralo "
+    "jsem ti roli „{role_name}“ a vyhodilo z tohoto vlákna. "
+    "Kdyby tě téma začalo zase zajímat, spusť tady `/follow`."
+)
+
+FOLLOW_ERROR_CONTENT = (
+    "-# Píp, promiň, ale tenhle příkaz funguje jenom "
+    "v zájmových skupinkách. Uvnitř <#1075087563645263922> "
+    "si najdi vlákno např. o Pythonu a v něm použij `/follow`."
+)
+
+FOLLOW_TEMPLATE = (
+    "-# Přihlásilo jsem tě do téhle zájmové skupinky. Dalo "
+    "jsem ti roli „{role_name}“ a přidalo tě sem do vlákna. "
+    "Kdyby tě téma přestalo zajímat, spusť tady `/unfollow`."
+)
+
+DM_REPLY_CONTENT = (
+    "Píp píp píp! Jsem jen malé kuřátko, které neumí číst soukromé zprávy a odpovídat na ně. "
+    "Tvou zprávu si nikdo nepřečte. Pokud se chceš na něco zeptat, zkus kanál "
+    "https://discord.com/channels/769966886598737931/806215364379148348 "
+    "nebo napiš do soukromé zprávy komukoliv z moderátorů. Rádi tě nasměrují."
+)
+
+INTEREST_NOTIFICATION_TEMPLATE = (
+    "-# {mentions} přidávám vás, protože jste si "
+    "v <id:customize> vybrali, že vás zajímá tohle téma. "
+    "Pokud vás to tu přestane bavit, spusťte tady příkaz "
+    "`/unfollow` a já vás odeberu."
+)
 
 
 logger = logging.getLogger("jg.chick.bot")
@@ -47,77 +120,188 @@ intents = discord.Intents(
     message_content=True,
 )
 
+message_routes = ChannelRoutes()
+
+thread_routes = ChannelRoutes()
+
+thread_message_routes = ChannelRoutes()
+
+EVENTS_HANDLERS: list[Callable[..., Awaitable[Any]]] = []
+
+COMMANDS: list[discord.SlashCommand] = []
+
 
 class ChickBot(commands.Bot):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
+        self._http_session: aiohttp.ClientSession | None = None
         self.interests: interests.Interests = {}
+        self.interests_fetcher = interests.InterestsFetcher()
+        self.notifications = interests.Debouncer()
+        self.snapshot_path: Path | None = None
+        self.thread_members = ThreadMembersCache()
+        self.starting_messages = StartingMessagesCache()
+        self.role_pings = RolePings()
+        self.bot_messages = BotMessages()
+        self.role_members = RoleMembersIndex()
+        self.profiles = ProfilesIndex()
+        self.summaries = SummariesCache()
+        self.reviews = ReviewQueue()
+        self.github_budget = GitHubRateBudget()
+        self.forum_tags = ForumTagsIndex()
+        self.message_routes = message_routes
+        self.thread_routes = thread_routes
+        self.thread_message_routes = thread_message_routes
+
+    @property
+    def channel_routes(self) -> list[ChannelRoutes]:
+        return [self.message_routes, self.thread_routes, self.thread_message_routes]
+
+    @property
+    def http_session(self) -> aiohttp.ClientSession:
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = http.create_session()
+        return self._http_session
+
+    async def close_http_session(self) -> None:
+        if self._http_session:
+            await self._http_session.close()
+
+
+bot: ChickBot
+
+
+def create_bot(
+    member_cache: bool = True,
+    chunk_guilds: bool = True,
+    max_messages: int | None = 1000,
+) -> ChickBot:
+    """
+    Creates the bot, which then handles all the events and commands
+
+    The arguments decide what the Discord library keeps in memory. Without
+    the member cache or chunking, the index of role members only knows
+    members which have shown up in events, so interest notifications can
+    miss some.
+    """
+    global bot
+    bot = ChickBot(
+        intents=intents,
+        member_cache_flags=(
+            discord.MemberCacheFlags.from_intents(intents)
+            if member_cache
+            else discord.MemberCacheFlags.none()
+        ),
+        chunk_guilds_at_startup=chunk_guilds,
+        max_messages=max_messages or None,
+    )
+    for handler in EVENTS_HANDLERS:
+        bot.event(handler)
+    for command in COMMANDS:
+        bot.add_application_command(command)
+    return bot
 
 
-bot = ChickBot(intents=intents)
+def event(handler: Handler) -> Handler:
+    EVENTS_HANDLERS.append(handler)
+    return handler
 
 
-@bot.event
+def slash_command(**kwargs) -> Callable[[Callable], discord.SlashCommand]:
+    def decorator(func: Callable) -> discord.SlashCommand:
+        command = discord.slash_command(**kwargs)(func)
+        COMMANDS.append(command)
+        return command
+
+    return decorator
+
+
+@event
 async def on_ready():
     for guild in bot.guilds:
         logger.info(f"Joined Discord {guild.name!r} as {guild.me.display_name!r}")
-
-    async with interests.modifications(), interests.report_fetch_error(bot):
-        bot.interests = interests.parse(
-            await interests.fetch(),
-            current_interests=bot.interests,
-        )
-        logger.info(f"Fetched {len(bot.interests)} interest threads")
-
+        bot.role_members.index_guild(guild)
+        for routes in bot.channel_routes:
+            routes.index_guild(guild)
+        for channel in guild.forum_channels:
+            check_review_tags(channel)
+
+    # fetching interests can take minutes if the API is down, so reviews
+    # shouldn't wait for it
+    if not bot.reviews.is_running:
+        bot.reviews.start()
+    if not refresh_profiles.is_running():
+        refresh_profiles.start()
+
+    if bot.snapshot_path and not bot.interests:
+        bot.interests = interests.load_snapshot(bot.snapshot_path)
+        logger.info(f"Loaded {len(bot.interests)} interest threads from snapshot")
+    await update_interests()
     if not refetch_interests.is_running():
         refetch_interests.start()
+    if bot.snapshot_path and not snapshot_interests.is_running():
+        snapshot_interests.start()
 
 
-@bot.event
+@event
 async def on_error(self, event, *args, **kwargs):
     logger.exception(f"Error while handling {event!r}")
     raise
 
 
-@bot.event
+@event
 async def on_message(message: discord.Message):
+    # most guild messages need no work at all, so they're dropped right away
+    thread = None
+    if message.guild is not None:
+        if isinstance(message.channel, discord.Thread):
+            thread = message.channel
+            handler = bot.thread_message_routes.get(thread.parent_id)
+            if handler is None and thread.id not in bot.interests:
+                return
+        elif (handler := bot.message_routes.get(message.channel.id)) is None:
+            return
+
     if not bot.user:
         raise RuntimeError("Bot user not initialized")
+    log_extra = {"event": "message", "channel_id": message.channel.id}
     if message.author.id == bot.user.id:
-        logger.info("Message sent by the bot itself, skipping")
+        logger.info("Message sent by the bot itself, skipping", extra=log_extra)
         return
     if is_thread_created(message) or message.is_system():
-        logger.info("System message, skipping")
+        logger.info("System message, skipping", extra=log_extra)
         return
+    started_at = time.perf_counter()
     if message.guild is None:
-        logger.info("Processing DM message")
-        return await on_dm_message(bot.user, message)
-    if channel := getattr(message.channel, "parent", None):
-        logger.info("Processing thread message")
-        thread = cast(discord.Thread, message.channel)
-        return await on_thread_message(bot.user, channel, thread, message)
-    logger.info("Processing regular message")
-    channel = cast(discord.GroupChannel, message.channel)
-    return await on_regular_message(bot.user, channel, message)
-
-
-@bot.slash_command(description="Nápověda k použití kuřete")
+        logger.info("Processing DM message", extra=log_extra)
+        await on_dm_message(bot.user, message)
+    elif thread:
+        log_extra = {
+            "event": "message",
+            "channel_id": thread.parent_id,
+            "thread_id": thread.id,
+        }
+        logger.info("Processing thread message", extra=log_extra)
+        await on_thread_message(thread, message, handler)
+    else:
+        logger.info("Processing regular message", extra=log_extra)
+        await handler(message)
+    if logger.isEnabledFor(logging.DEBUG):
+        log_extra["duration"] = f"{time.perf_counter() - started_at:.3f}s"
+        logger.debug("Processed message", extra=log_extra)
+
+
+@slash_command(description="Nápověda k použití kuřete")
 async def help(context: discord.ApplicationContext):
-    await context.respond(
-        "-# Píp píp píp! Všechno se dovíš v [dokumentaci na webu](https://junior.guru/about/bot/) 📖"
-    )
+    await context.respond(HELP_CONTENT)
 
 
-@bot.slash_command(description="Jaké je tvoje Discord ID?")
+@slash_command(description="Jaké je tvoje Discord ID?")
 async def discord_id(context: discord.ApplicationContext):
-    await context.respond(
-        f"-# Tvoje Discord ID je `{context.author.id}`. "
-        "Až si budeš zakládat profil v [seznamu kandidátů](https://junior.guru/candidates/), "
-        "bude se ti tahle informace hodit <a:awkward:985064290044223488>"
-    )
+    await context.respond(DISCORD_ID_TEMPLATE.format(discord_id=context.author.id))
 
 
-@bot.slash_command(description="Odhlásí tě ze zájmové skupinky")
+@slash_command(description="Odhlásí tě ze zájmové skupinky")
 async def unfollow(context: discord.ApplicationContext):
     try:
         guild = cast(discord.Guild, context.guild)
@@ -126,31 +310,18 @@ async def unfollow(context: discord.ApplicationContext):
         interest = bot.interests[thread.id]
         role = cast(discord.Role, guild.get_role(interest["role_id"]))
     except (AttributeError, KeyError):
-        await context.respond(
-            (
-                "-# Píp, promiň, ale tenhle příkaz funguje jenom "
-                "v zájmových vláknech uvnitř <#1075087563645263922>. "
-                "Pokud už tě nebaví např. Python, jdi do jeho vlákna "
-                "a tam použij `/unfollow`."
-            ),
-            delete_after=30,
-        )
+        await context.respond(UNFOLLOW_ERROR_CONTENT, delete_after=30)
         return
 
     if role in member.roles:
         await member.remove_roles(role, reason="User requested /unfollow")
     await thread.remove_user(member)
     await context.respond(
-        (
-            "-# Odhlásilo jsem tě z téhle zájmové skupinky. Odebralo "
-            f"jsem ti roli „{role.name}“ a vyhodilo z tohoto vlákna. "
-            "Kdyby tě téma začalo zase zajímat, spusť tady `/follow`."
-        ),
-        delete_after=30,
+        UNFOLLOW_TEMPLATE.format(role_name=role.name), delete_after=30
     )
 
 
-@bot.slash_command(description="Přihlásí tě do zájmové skupinky")
+@slash_command(description="Přihlásí tě do zájmové skupinky")
 async def follow(context: discord.ApplicationContext):
     try:
         guild = cast(discord.Guild, context.guild)
@@ -159,132 +330,248 @@ async def follow(context: discord.ApplicationContext):
         interest = bot.interests[thread.id]
         role = cast(discord.Role, guild.get_role(interest["role_id"]))
     except (AttributeError, KeyError):
-        await context.respond(
-            (
-                "-# Píp, promiň, ale tenhle příkaz funguje jenom "
-                "v zájmových skupinkách. Uvnitř <#1075087563645263922> "
-                "si najdi vlákno např. o Pythonu a v něm použij `/follow`."
-            ),
-            delete_after=30,
-        )
+        await context.respond(FOLLOW_ERROR_CONTENT, delete_after=30)
         return
 
     if role not in member.roles:
         await member.add_roles(role, reason="User requested /follow")
-    await context.respond(
-        (
-            "-# Přihlásilo jsem tě do téhle zájmové skupinky. Dalo "
-            f"jsem ti roli „{role.name}“ a přidalo tě sem do vlákna. "
-            "Kdyby tě téma přestalo zajímat, spusť tady `/unfollow`."
-        ),
-        delete_after=30,
-    )
+    await context.respond(FOLLOW_TEMPLATE.format(role_name=role.name), delete_after=30)
 
 
 @tasks.loop(hours=6)
 async def refetch_interests():
-    async with interests.modifications(), interests.report_fetch_error(bot):
-        bot.interests = interests.parse(
-            await interests.fetch(),
-            current_interests=bot.interests,
-        )
-        logger.info(f"Fetched {len(bot.interests)} interest threads")
+    await update_interests()
+
+
+@tasks.loop(minutes=10)
+async def snapshot_interests():
+    save_interests_snapshot()
+
+
+@tasks.loop(seconds=PROFILES_TTL.total_seconds())
+async def refresh_profiles():
+    await bot.profiles.refresh(bot.http_session)
+
+
+def save_interests_snapshot():
+    # empty interests mean the bot didn't get to fetch them yet,
+    # so there's nothing worth saving and a good snapshot could be lost
+    if bot.snapshot_path and bot.interests:
+        try:
+            interests.save_snapshot(bot.interests, bot.snapshot_path)
+            logger.debug(f"Saved snapshot of interests to {bot.snapshot_path}")
+        except OSError:
+            logger.exception(f"Failed to save snapshot to {bot.snapshot_path}")
+
+
+async def update_interests():
+    async with interests.report_fetch_error(bot):
+        if (api_payload := await bot.interests_fetcher.fetch(bot.http_session)) is None:
+            return
+        # diffing and applying doesn't await, so it's atomic for the message handlers
+        interests_diff = interests.diff(bot.interests, api_payload)
+        interests.apply(bot.interests, interests_diff)
+        logger.info(f"Fetched {len(bot.interests)} interest threads ({interests_diff})")
+        if interests_diff:
+            bot.dispatch("interests_update", interests_diff)
+
+
+@event
+async def on_interests_update(interests_diff: interests.InterestsDiff):
+    for thread_id in interests_diff.removed:
+        bot.thread_members.forget(thread_id)
 
 
 async def on_dm_message(bot_user: discord.ClientUser, message: discord.Message):
     try:
-        await message.reply(
-            (
-                "Píp píp píp! Jsem jen malé kuřátko, které neumí číst soukromé zprávy a odpovídat na ně. "
-                "Tvou zprávu si nikdo nepřečte. Pokud se chceš na něco zeptat, zkus kanál "
-                "https://discord.com/channels/769966886598737931/806215364379148348 "
-                "nebo napiš do soukromé zprávy komukoliv z moderátorů. Rádi tě nasměrují."
-            )
-        )
+        await message.reply(DM_REPLY_CONTENT)
     except discord.errors.Forbidden:
         logger.warning("User has DMs disabled, skipping")
 
 
 async def on_thread_message(
-    bot_user: discord.ClientUser,
-    channel: discord.GroupChannel,
     thread: discord.Thread,
     message: discord.Message,
+    handler: Callable[[discord.Thread, discord.Message], Awaitable[None]] | None,
 ):
     now = datetime.now(UTC)
 
-    if channel.name == "cv-github-linkedin" and bot_user.mention in message.content:
+    if handler:
+        await handler(thread, message)
+
+    interest = bot.interests.get(thread.id)
+    if (
+        interest
+        and interests.should_notify(interest, now)
+        and bot.notifications.schedule(
+            thread.id, lambda: notify_interest_thread(thread)
+        )
+    ):
+        logger.info(
+            "Noticed message in interest thread %r",
+            thread.name,
+            extra={"event": "message", "thread_id": thread.id},
+        )
+
+
+@thread_message_routes.route("cv-github-linkedin")
+async def handle_review_mention(thread: discord.Thread, message: discord.Message):
+    if bot.user and bot.user.mention in message.content:
         logger.info("Noticed mention in #cv-github-linkedin, starting review")
-        starting_message = (await fetch_starting_message(thread)) or message
-        await handle_review_thread(starting_message, thread)
-
-    async with interests.modifications():
-        if interest := bot.interests.get(thread.id):
-            logger.info(f"Noticed message in interest thread {thread.name!r}")
-            if interests.should_notify(interest, now):
-                missing_members = await get_missing_members(thread, interest["role_id"])
-                if len(missing_members) <= 1:
-                    logger.info(f"Not adding, too few: {len(missing_members)}")
-                else:
-                    # TODO hotfix, deletes also messages which are not related to the interest notification
-                    # logger.info("Clearing recent bot messages")
-                    # await clear_recent_bot_messages(thread, now=now)
-                    logger.info(f"Adding role #{interest['role_id']}")
-                    mentions_text = " ".join([m.mention for m in missing_members])
-                    adding_message = (
-                        f"-# {mentions_text} přidávám vás, protože jste si "
-                        "v <id:customize> vybrali, že vás zajímá tohle téma. "
-                        "Pokud vás to tu přestane bavit, spusťte tady příkaz "
-                        "`/unfollow` a já vás odeberu."
-                    )
-                    await thread.send(adding_message, silent=True)
-                interest["last_notified_at"] = now
+        starting_message = (
+            await fetch_starting_message(thread, bot.starting_messages)
+        ) or message
+        # the review is reused if the profile didn't change, unless asked otherwise
+        await submit_review_thread(
+            starting_message, thread, recheck=is_recheck_requested(message.content)
+        )
+
+
+async def notify_interest_thread(thread: discord.Thread):
+    now = datetime.now(UTC)
+    async with interests.claim_notification(bot.interests, thread.id, now) as interest:
+        if interest:
+            missing_members = await get_missing_members(
+                thread, interest["role_id"], bot.thread_members, bot.role_members
+            )
+            if len(missing_members) <= 1:
+                logger.info(f"Not adding, too few: {len(missing_members)}")
             else:
-                logger.info("Not adding due to cooldown")
+                logger.info("Clearing recent interest notifications")
+                await clear_bot_messages(
+                    thread, bot.bot_messages, INTEREST_NOTIFICATION_PURPOSE, now=now
+                )
+                logger.info(f"Adding role #{interest['role_id']}")
+                mentions_text = " ".join([m.mention for m in missing_members])
+                notification = await thread.send(
+                    INTEREST_NOTIFICATION_TEMPLATE.format(mentions=mentions_text),
+                    silent=True,
+                )
+                bot.bot_messages.record(
+                    thread.id, INTEREST_NOTIFICATION_PURPOSE, notification.id
+                )
+                for member in missing_members:
+                    bot.thread_members.add(thread.id, member.id)
 
 
-async def on_regular_message(
-    bot_user: discord.ClientUser,
-    channel: discord.GroupChannel,
-    message: discord.Message,
+@event
+async def on_member_join(member: discord.Member):
+    bot.role_members.add_member(member)
+
+
+@event
+async def on_member_remove(member: discord.Member):
+    bot.role_members.remove_member(member)
+
+
+@event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    bot.role_members.update_member(before, after)
+
+
+@event
+async def on_guild_role_delete(role: discord.Role):
+    bot.role_members.remove_role(role.id)
+
+
+@event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    for routes in bot.channel_routes:
+        routes.add_channel(channel)
+
+
+@event
+async def on_guild_channel_update(
+    before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
 ):
-    if channel.name == "ahoj":
-        logger.info("Creating thread in #ahoj")
-        name = name_thread(message, INTRO_THREAD_NAME_TEMPLATE)
-        await message.create_thread(name=name)
-        return
+    for routes in bot.channel_routes:
+        routes.update_channel(after)
+    bot.forum_tags.forget(after.id)
+    if isinstance(after, discord.ForumChannel):
+        check_review_tags(after)
 
-    if channel.name == "past-vedle-pasti":
-        logger.info("Creating thread in #past-vedle-pasti")
-        name = name_thread(
-            message,
-            "{weekday} past na {author}",
-            bracket_name_template="Past na {author}: {bracket_content}",
-        )
-        await message.create_thread(name=name)
-        return
 
-    if channel.name == "můj-dnešní-objev":
-        logger.info("Creating thread in #můj-dnešní-objev")
-        name = name_thread(
-            message,
-            "{weekday} objev od {author}",
-            bracket_name_template="Objev od {author}: {bracket_content}",
-        )
-        await message.create_thread(name=name)
-        return
+def check_review_tags(channel: discord.ForumChannel):
+    if channel.name == "cv-github-linkedin":
+        if missing_tags := find_missing_tags(
+            channel, REVIEW_TAGS_NAMES, bot.forum_tags
+        ):
+            logger.error(f"Missing tags in {channel.name!r}: {missing_tags!r}")
+
+
+@event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    for routes in bot.channel_routes:
+        routes.remove_channel(channel.id)
+    bot.forum_tags.forget(channel.id)
+
+
+@event
+async def on_thread_member_join(member: discord.ThreadMember):
+    bot.thread_members.add(member.thread_id, member.id)
+
+
+@event
+async def on_raw_thread_member_remove(payload: discord.RawThreadMembersUpdateEvent):
+    for member_id in payload.data.get("removed_member_ids", []):
+        bot.thread_members.remove(payload.thread_id, int(member_id))
+
+
+@event
+async def on_raw_thread_delete(payload: discord.RawThreadDeleteEvent):
+    bot.thread_members.forget(payload.thread_id)
+    bot.starting_messages.forget(payload.thread_id)
+
 
+@event
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    # starting messages of threads have the same ID as the thread
+    bot.starting_messages.forget(payload.message_id)
 
-@bot.event
+
+@event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    bot.starting_messages.forget(payload.message_id)
+
+
+@message_routes.route("ahoj")
+async def create_intro_thread(message: discord.Message):
+    logger.info("Creating thread in #ahoj")
+    name = name_thread(message, INTRO_THREAD_NAME_TEMPLATE)
+    await message.create_thread(name=name)
+
+
+@message_routes.route("past-vedle-pasti")
+async def create_trap_thread(message: discord.Message):
+    logger.info("Creating thread in #past-vedle-pasti")
+    name = name_thread(
+        message,
+        "{weekday} past na {author}",
+        bracket_name_template="Past na {author}: {bracket_content}",
+    )
+    await message.create_thread(name=name)
+
+
+@message_routes.route("můj-dnešní-objev")
+async def create_discovery_thread(message: discord.Message):
+    logger.info("Creating thread in #můj-dnešní-objev")
+    name = name_thread(
+        message,
+        "{weekday} objev od {author}",
+        bracket_name_template="Objev od {author}: {bracket_content}",
+    )
+    await message.create_thread(name=name)
+
+
+@event
 async def on_thread_create(thread: discord.Thread):
-    if not thread.parent:
-        logger.warning(f"Thread {thread.name!r} has no parent, skipping")
+    if (handler := bot.thread_routes.get(thread.parent_id)) is None:
         return
 
-    channel_name = thread.parent.name
+    channel_name = thread.parent.name if thread.parent else thread.parent_id
     logger.info(f"Thread {thread.name!r} created in {channel_name!r}")
 
-    starting_message = await fetch_starting_message(thread)
+    starting_message = await fetch_starting_message(thread, bot.starting_messages)
     if not starting_message:
         logger.warning(f"Thread {thread.name!r} has no starting message, skipping")
         return
@@ -293,16 +580,10 @@ async def on_thread_create(thread: discord.Thread):
         logger.info("Thread created by the bot itself, skipping")
         return
 
-    if channel_name == "ahoj":
-        await handle_intro_thread(starting_message, thread)
-    elif channel_name == "práce-inzeráty":
-        await handle_job_posting_thread(starting_message, thread)
-    elif channel_name == "práce-hledám":
-        await handle_candidate_thread(starting_message, thread)
-    elif channel_name == "cv-github-linkedin":
-        await handle_review_thread(starting_message, thread)
+    await handler(starting_message, thread)
 
 
+@thread_routes.route("ahoj")
 async def handle_intro_thread(
     starting_message: discord.Message, thread: discord.Thread
 ):
@@ -311,7 +592,7 @@ async def handle_intro_thread(
         f"Processing thread {thread.name!r} (reacting with {emojis!r} and more…)"
     )
     tasks = [
-        ensure_thread_name(thread, INTRO_THREAD_NAME_TEMPLATE),
+        ensure_thread_name(thread, INTRO_THREAD_NAME_TEMPLATE, bot.starting_messages),
         manage_intro_thread(thread, starting_message.content),
     ]
     tasks.extend([starting_message.add_reaction(emoji) for emoji in emojis])
@@ -320,9 +601,10 @@ async def handle_intro_thread(
 
 async def manage_intro_thread(thread: discord.Thread, intro_message_content: str):
     await thread.send(**generate_intro_message(intro_message_content))
-    await ping_members_with_role(thread, GREETER_ROLE_ID)
+    await ping_members_with_role(thread, GREETER_ROLE_ID, bot.role_pings)
 
 
+@thread_routes.route("práce-inzeráty")
 async def handle_job_posting_thread(
     starting_message: discord.Message, thread: discord.Thread
 ):
@@ -330,6 +612,7 @@ async def handle_job_posting_thread(
     await starting_message.add_reaction("<:dk:842727526736068609>")
 
 
+@thread_routes.route("práce-hledám")
 async def handle_candidate_thread(
     starting_message: discord.Message, thread: discord.Thread
 ):
@@ -337,74 +620,45 @@ async def handle_candidate_thread(
     await starting_message.add_reaction("👍")
 
 
-async def handle_review_thread(
-    starting_message: discord.Message, thread: discord.Thread
+@thread_routes.route("cv-github-linkedin")
+async def submit_review_thread(
+    starting_message: discord.Message, thread: discord.Thread, recheck: bool = False
 ):
-    if cv_url := find_cv_url(starting_message.attachments):
-        logger.info(f"Found CV in {thread.name!r}, reviewing…")
+    profile_urls = extract_profile_urls(
+        starting_message.content, starting_message.attachments
+    )
+    if not bot.reviews.submit(
+        lambda: handle_review_thread(starting_message, thread, profile_urls, recheck)
+    ):
+        await starting_message.reply(QUEUE_FULL_CONTENT)
+        return
+    # the review itself can take a while, so let the author know it's coming
+    if profile_urls:
         await starting_message.add_reaction("🔬")
-        await starting_message.reply(
-            (
-                "📝 Zavětřilo jsem CV"
-                "\n\n"
-                "🙏 Na CV zatím zpětnou vazbu dávat neumím, ale třeba pomůže někdo jiný"
-                "\n\n"
-                "💡 Přečti si [návod na CV](https://junior.guru/handbook/cv/) v příručce, ušetříš spoustu času sobě i nám! "
-                "Ve zpětné vazbě nebudeme muset opakovat rady z návodu a budeme se moci soustředit na to podstatné."
-            ),
-            suppress=True,
-        )
-        await ping_members_with_role(thread, REVIEWER_ROLE_ID)
 
-    if github_url := find_github_url(starting_message.content):
-        logger.info(f"Found {github_url} in {thread.name!r}, reviewing…")
-        await starting_message.add_reaction("🔬")
-        await starting_message.reply(
-            (
-                f"<:github:842685206095724554> Zavětřilo jsem [GitHub profil]({github_url}), jdu se v tom pohrabat…"
-                "\n\n"
-                "💡 Přečti si [návod na GitHub profil](https://junior.guru/handbook/github-profile/) v příručce, pochopíš kontext mých doporučení."
-            ),
-            suppress=True,
-        )
-        logger.info("Checking profiles API…")
-        profiles = []
-        async with aiohttp.ClientSession() as session:
-            async with session.get(EGGTRAY_API_URL) as resp:
-                if resp.status == 200:
-                    profiles = (await resp.json())["items"]
-                    logger.info(f"Found {len(profiles)} profiles")
-
-        async with thread.typing():
-            logger.debug(f"{'Using' if GITHUB_API_KEY else 'Not using'} GitHub API key")
-            summary = await check_profile_url(github_url, github_api_key=GITHUB_API_KEY)
-            logger.info(
-                f"Done reviewing {github_url}: {'ERROR' if summary.error else 'OK'}"
-            )
-            has_profile = any(
-                profile["github_username"] == summary.username for profile in profiles
-            )
-            logger.info(f"User has profile: {has_profile}")
-            for message in format_summary(summary, has_profile):
-                await thread.send(**message)
 
-    if linkedin_url := find_linkedin_url(starting_message.content):
-        logger.info(f"Found {linkedin_url} in {thread.name!r}, reviewing…")
-        await starting_message.add_reaction("🔬")
-        await starting_message.reply(
-            (
-                f"<:linkedin:915267970752712734> Zavětřilo jsem [LinkedIn profil]({linkedin_url})"
-                "\n\n"
-                "🙏 Na LinkedIn zatím zpětnou vazbu dávat neumím, ale třeba pomůže někdo jiný"
-                "\n\n"
-                "💡 Přidej se do [naší LinkedIn skupiny](https://www.linkedin.com/groups/13988090/). "
-                "Můžeš se pak snadno propojit s ostatními členy a oni s tebou. "
-                "Zároveň se ti bude logo junior.guru zobrazovat na profilu v sekci „zájmy”. "
-                "Nevíme, jestli ti to přidá nějaký kredit u recruiterů, ale vyloučeno to není!"
-            ),
-            suppress=True,
-        )
-        await ping_members_with_role(thread, REVIEWER_ROLE_ID)
+async def handle_review_thread(
+    starting_message: discord.Message,
+    thread: discord.Thread,
+    profile_urls: ProfileURLs,
+    recheck: bool = False,
+):
+    # people sometimes link more profiles, but only the first of each kind is theirs
+    cv_url = next(iter(profile_urls.cv), None)
+    github_url = next(iter(profile_urls.github), None)
+    linkedin_url = next(iter(profile_urls.linkedin), None)
+
+    # branches run concurrently and a failing one doesn't cancel the others
+    branches = []
+    if cv_url:
+        branches.append(review_cv(starting_message, thread))
+    if github_url:
+        branches.append(review_github(starting_message, thread, github_url, recheck))
+    if linkedin_url:
+        branches.append(review_linkedin(starting_message, thread, linkedin_url))
+    for result in await asyncio.gather(*branches, return_exceptions=True):
+        if isinstance(result, BaseException):
+            logger.exception(f"Failed to review {thread.name!r}", exc_info=result)
 
     await thread.edit(
         applied_tags=prepare_tags(
@@ -412,5 +666,105 @@ async def handle_review_thread(
             cv=bool(cv_url),
             github=bool(github_url),
             linkedin=bool(linkedin_url),
+            forum_tags=bot.forum_tags,
+        )
+    )
+
+
+async def review_cv(starting_message: discord.Message, thread: discord.Thread):
+    logger.info(f"Found CV in {thread.name!r}, reviewing…")
+    await asyncio.gather(
+        starting_message.reply(CV_REPLY_CONTENT, suppress=True),
+        ping_members_with_role(thread, REVIEWER_ROLE_ID, bot.role_pings),
+    )
+
+
+async def review_github(
+    starting_message: discord.Message,
+    thread: discord.Thread,
+    github_url: str,
+    recheck: bool = False,
+    reply: bool = True,
+):
+    logger.info(f"Found {github_url} in {thread.name!r}, reviewing…")
+    async with thread.typing():
+        logger.debug(f"{'Using' if GITHUB_API_KEY else 'Not using'} GitHub API key")
+        # a failed reply or profiles refresh shouldn't throw away the review
+        reply_result, refresh_result, summary = await asyncio.gather(
+            starting_message.reply(
+                GITHUB_REPLY_TEMPLATE.format(github_url=github_url), suppress=True
+            )
+            if reply
+            else asyncio.sleep(0),
+            refresh_stale_profiles(),
+            review_github_profile(
+                github_url,
+                bot.summaries,
+                recheck,
+                session=bot.http_session,
+                github_budget=bot.github_budget,
+            ),
+            return_exceptions=True,
         )
+        if isinstance(reply_result, BaseException):
+            logger.exception(
+                f"Failed to reply to {thread.name!r}", exc_info=reply_result
+            )
+        if isinstance(summary, GitHubRateLimited) and summary.reset_at:
+            await defer_review_github(
+                starting_message, thread, github_url, recheck, summary.reset_at
+            )
+            return
+        if isinstance(summary, BaseException):
+            raise summary
+        logger.info(
+            f"Done reviewing {github_url}: {'ERROR' if summary.error else 'OK'}"
+        )
+        if isinstance(refresh_result, BaseException):
+            logger.exception("Failed to refresh profiles", exc_info=refresh_result)
+            has_profile = False
+        else:
+            has_profile = summary.username in bot.profiles
+        logger.info(f"User has profile: {has_profile}")
+        for message in pack_messages(format_summary(summary, has_profile)):
+            await thread.send(**message)
+
+
+async def defer_review_github(
+    starting_message: discord.Message,
+    thread: discord.Thread,
+    github_url: str,
+    recheck: bool,
+    reset_at: datetime,
+):
+    logger.warning(f"Deferring review of {github_url} until {reset_at}")
+    await starting_message.reply(
+        GITHUB_DEFERRED_TEMPLATE.format(
+            github_url=github_url, timestamp=int(reset_at.timestamp())
+        ),
+        suppress=True,
+    )
+    bot.reviews.submit_later(
+        lambda: review_github(
+            starting_message, thread, github_url, recheck, reply=False
+        ),
+        reset_at - datetime.now(UTC),
+    )
+
+
+async def refresh_stale_profiles():
+    if bot.profiles.is_stale:
+        logger.info("Profiles are stale, refreshing…")
+        await bot.profiles.refresh(bot.http_session)
+
+
+async def review_linkedin(
+    starting_message: discord.Message, thread: discord.Thread, linkedin_url: str
+):
+    logger.info(f"Found {linkedin_url} in {thread.name!r}, reviewing…")
+    await asyncio.gather(
+        starting_message.reply(
+            LINKEDIN_REPLY_TEMPLATE.format(linkedin_url=linkedin_url), suppress=True
+        ),
+        ping_members_with_role(thread, REVIEWER_ROLE_ID, bot.role_pings),
     )
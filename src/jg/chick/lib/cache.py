@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Generic, TypeVar
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Dict-like cache which drops the least recently used items when full
+
+    If ttl is given, items older than that are treated as missing.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: timedelta | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: K) -> bool:
+        try:
+            _, expires_at = self._items[key]
+        except KeyError:
+            return False
+        return not self._is_expired(expires_at)
+
+    def get(self, key: K) -> V | None:
+        try:
+            value, expires_at = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if self._is_expired(expires_at):
+            del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = time.monotonic() + self.ttl.total_seconds()
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        try:
+            value, expires_at = self._items.pop(key)
+        except KeyError:
+            return None
+        return None if self._is_expired(expires_at) else value
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def _is_expired(self, expires_at: float | None) -> bool:
+        return expires_at is not None and time.monotonic() >= expires_at
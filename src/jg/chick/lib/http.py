@@ -0,0 +1,75 @@
+import contextlib
+from typing import Any, AsyncIterator
+
+import aiohttp
+
+
+CONNECTIONS_LIMIT = 20
+
+CONNECTIONS_LIMIT_PER_HOST = 10
+
+DNS_CACHE_TTL_SEC = 300
+
+KEEPALIVE_TIMEOUT_SEC = 60
+
+TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10)
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Returns a session meant to be shared by all outbound HTTP requests
+
+    Connections are kept alive and DNS lookups are cached, so repeated
+    requests to the same host skip the DNS lookup and the TLS handshake.
+    Must be called inside a running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTIONS_LIMIT,
+        limit_per_host=CONNECTIONS_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL_SEC,
+        keepalive_timeout=KEEPALIVE_TIMEOUT_SEC,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=TIMEOUT)
+
+
+@contextlib.asynccontextmanager
+async def use_session(
+    session: aiohttp.ClientSession | None = None,
+) -> AsyncIterator[aiohttp.ClientSession]:
+    """Yields given session, or a new one which gets closed afterwards"""
+    if session:
+        yield session
+    else:
+        async with aiohttp.ClientSession() as own_session:
+            yield own_session
+
+
+class ConditionalGet:
+    """
+    Fetches JSON from given URL only if it has changed since the last time
+
+    Uses ETag and Last-Modified headers of the last response to make
+    conditional requests.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+
+    async def fetch_json(self, session: aiohttp.ClientSession) -> Any | None:
+        """Returns the parsed response, or None if it hasn't been modified"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        async with session.get(
+            self.url, headers=headers, raise_for_status=True
+        ) as resp:
+            if resp.status == 304:
+                return None
+            data = await resp.json()
+            self.etag = resp.headers.get("ETag")
+            self.last_modified = resp.headers.get("Last-Modified")
+            return data
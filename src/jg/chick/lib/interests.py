@@ -1,12 +1,19 @@
 import asyncio
 import contextlib
+import json
 import logging
+import os
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import TypedDict
+from pathlib import Path
+from typing import Awaitable, Callable, TypedDict
 
 import aiohttp
 import discord
 
+from jg.chick.lib import http
+
 
 INTERESTS_API_URL = "https://junior.guru/api/interests.json"
 
@@ -14,10 +21,20 @@ ERROR_REPORT_CHANNEL_ID = 1135903241792651365
 
 NOTIFICATION_COOLDOWN = timedelta(days=1)
 
+NOTIFICATION_DELAY = timedelta(seconds=5)
+
+FETCH_MIN_INTERVAL = timedelta(minutes=5)
+
+FETCH_RETRIES = 3
+
+FETCH_BACKOFF = timedelta(seconds=2)
+
+LOCK_STRIPES = 64
+
 
 logger = logging.getLogger("jg.chick.interests")
 
-_lock = asyncio.Lock()
+_locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
 
 
 ThreadID = int
@@ -33,26 +50,199 @@ class Interest(TypedDict):
 Interests = dict[ThreadID, Interest]
 
 
-async def fetch(interests_api_url: str = INTERESTS_API_URL) -> list[dict]:
-    async with (
-        aiohttp.ClientSession(raise_for_status=True) as session,
-        session.get(interests_api_url) as resp,
+@dataclass(frozen=True)
+class InterestsDiff:
+    added: dict[ThreadID, RoleID] = field(default_factory=dict)
+    removed: list[ThreadID] = field(default_factory=list)
+    changed: dict[ThreadID, RoleID] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, "
+            f"{len(self.changed)} changed"
+        )
+
+
+class InterestsFetcher:
+    """
+    Fetches the interests API only if it has changed since the last time
+
+    Uses ETag and Last-Modified headers to make conditional requests. Fetching
+    again within min_interval is skipped altogether, so that reconnects can't
+    cause a burst of downloads. Failed requests are retried with exponential
+    backoff. If all retries fail, the last good payload stays in place.
+    """
+
+    def __init__(
+        self,
+        interests_api_url: str = INTERESTS_API_URL,
+        min_interval: timedelta = FETCH_MIN_INTERVAL,
+        retries: int = FETCH_RETRIES,
+        backoff: timedelta = FETCH_BACKOFF,
     ):
-        return await resp.json()
+        self.interests_api_url = interests_api_url
+        self._conditional_get = http.ConditionalGet(interests_api_url)
+        self.min_interval = min_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.payload: list[dict] | None = None
+        self._checked_at: float | None = None
+        self._lock = asyncio.Lock()
 
+    async def fetch(
+        self, session: aiohttp.ClientSession | None = None
+    ) -> list[dict] | None:
+        """Returns the payload if it has changed since the last fetch, None otherwise"""
+        async with self._lock:
+            if self._checked_at is not None and (
+                time.monotonic() - self._checked_at < self.min_interval.total_seconds()
+            ):
+                logger.info("Interests checked recently, skipping")
+                return None
+            for attempt in range(self.retries + 1):
+                try:
+                    async with http.use_session(session) as http_session:
+                        payload = await self._fetch(http_session)
+                    self._checked_at = time.monotonic()
+                    return payload
+                except (aiohttp.ClientError, TimeoutError):
+                    if attempt == self.retries:
+                        if self.payload is None:
+                            raise
+                        logger.exception("Failed to fetch interests, keeping stale")
+                        return None
+                    delay = self.backoff.total_seconds() * 2**attempt
+                    logger.warning(f"Failed to fetch interests, retrying in {delay}s")
+                    await asyncio.sleep(delay)
+        return None
 
-def parse(api_payload: list[dict], current_interests: Interests) -> Interests:
-    current_state = {
-        interest_id: interest["last_notified_at"]
-        for interest_id, interest in (current_interests or {}).items()
-    }
-    return {
-        item["thread_id"]: {
-            "role_id": item["role_id"],
-            "last_notified_at": current_state.get(item["thread_id"]),
+    async def _fetch(self, session: aiohttp.ClientSession) -> list[dict] | None:
+        if (payload := await self._conditional_get.fetch_json(session)) is None:
+            logger.info("Interests not modified")
+            return None
+        self.payload = payload
+        return self.payload
+
+
+class Debouncer:
+    """
+    Runs jobs in the background, at most one pending job per thread
+
+    A job gets delayed and any other job scheduled for the same thread
+    in the meantime is dropped, so a burst of messages results in a single
+    run. Scheduling returns immediately.
+    """
+
+    def __init__(self, delay: timedelta = NOTIFICATION_DELAY):
+        self.delay = delay
+        self._tasks: dict[ThreadID, asyncio.Task] = {}
+
+    def __contains__(self, thread_id: ThreadID) -> bool:
+        return thread_id in self._tasks
+
+    def schedule(self, thread_id: ThreadID, job: Callable[[], Awaitable[None]]) -> bool:
+        if thread_id in self._tasks:
+            return False
+        self._tasks[thread_id] = asyncio.create_task(self._run(thread_id, job))
+        return True
+
+    async def _run(
+        self, thread_id: ThreadID, job: Callable[[], Awaitable[None]]
+    ) -> None:
+        try:
+            await asyncio.sleep(self.delay.total_seconds())
+            await job()
+        except Exception:
+            logger.exception(f"Failed to notify thread #{thread_id}")
+        finally:
+            del self._tasks[thread_id]
+
+
+def diff(current_interests: Interests, api_payload: list[dict]) -> InterestsDiff:
+    """Returns changes needed to turn current interests into the API payload"""
+    roles_ids = {item["thread_id"]: item["role_id"] for item in api_payload}
+    return InterestsDiff(
+        added={
+            thread_id: role_id
+            for thread_id, role_id in roles_ids.items()
+            if thread_id not in current_interests
+        },
+        removed=[
+            thread_id for thread_id in current_interests if thread_id not in roles_ids
+        ],
+        changed={
+            thread_id: role_id
+            for thread_id, role_id in roles_ids.items()
+            if thread_id in current_interests
+            and current_interests[thread_id]["role_id"] != role_id
+        },
+    )
+
+
+def apply(current_interests: Interests, interests_diff: InterestsDiff) -> None:
+    """
+    Applies given changes to current interests in place
+
+    Unchanged interests stay the same objects, so whoever holds a reference
+    to them keeps seeing the current notification state.
+    """
+    for thread_id in interests_diff.removed:
+        del current_interests[thread_id]
+    for thread_id, role_id in interests_diff.added.items():
+        current_interests[thread_id] = {"role_id": role_id, "last_notified_at": None}
+    for thread_id, role_id in interests_diff.changed.items():
+        current_interests[thread_id] = {
+            "role_id": role_id,
+            "last_notified_at": current_interests[thread_id]["last_notified_at"],
+        }
+
+
+def save_snapshot(interests: Interests, path: Path) -> None:
+    """
+    Saves notification state of given interests to a file
+
+    The file is written next to the target and then renamed, so a crash
+    can't leave a half-written snapshot behind.
+    """
+    data = {
+        str(thread_id): {
+            "role_id": interest["role_id"],
+            "last_notified_at": (
+                interest["last_notified_at"].isoformat()
+                if interest["last_notified_at"]
+                else None
+            ),
         }
-        for item in api_payload
+        for thread_id, interest in interests.items()
     }
+    temp_path = path.with_name(f"{path.name}.tmp")
+    temp_path.write_text(json.dumps(data))
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path: Path) -> Interests:
+    """Returns interests saved to a file, or no interests if there is no valid file"""
+    try:
+        data = json.loads(path.read_text())
+        return {
+            int(thread_id): {
+                "role_id": item["role_id"],
+                "last_notified_at": (
+                    datetime.fromisoformat(item["last_notified_at"])
+                    if item["last_notified_at"]
+                    else None
+                ),
+            }
+            for thread_id, item in data.items()
+        }
+    except FileNotFoundError:
+        logger.info(f"No snapshot of interests at {path}")
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        logger.exception(f"Failed to load snapshot of interests from {path}")
+    return {}
 
 
 @contextlib.asynccontextmanager
@@ -82,9 +272,48 @@ def should_notify(
 
 
 @contextlib.asynccontextmanager
-async def modifications():
+async def modifications(thread_id: ThreadID):
     """
     Avoids duplicate notifications or updating notification state inconsistently
+
+    Threads are spread over a fixed number of locks, so a slow notification
+    only holds up the few threads which happen to share its lock.
     """
-    async with _lock:
+    async with _locks[thread_id % LOCK_STRIPES]:
         yield
+
+
+@contextlib.asynccontextmanager
+async def claim_notification(
+    interests: Interests,
+    thread_id: ThreadID,
+    now: datetime,
+    cooldown: timedelta | None = None,
+):
+    """
+    Yields the interest of given thread if it's time to notify its members
+
+    Otherwise yields None. The notification time is recorded before yielding,
+    so neither concurrent messages nor a refresh of interests in the meantime
+    can lead to a duplicate notification. If the notification fails, the
+    previous notification time is restored.
+    """
+    if thread_id not in interests:
+        yield None
+        return
+    async with modifications(thread_id):
+        interest = interests.get(thread_id)
+        if interest is None:
+            yield None
+            return
+        if not should_notify(interest, now, cooldown):
+            logger.info(f"Not notifying thread #{thread_id} due to cooldown")
+            yield None
+            return
+        last_notified_at = interest["last_notified_at"]
+        interest["last_notified_at"] = now
+        try:
+            yield interest
+        except BaseException:
+            interest["last_notified_at"] = last_notified_at
+            raise
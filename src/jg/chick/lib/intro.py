@@ -1,14 +1,64 @@
+import asyncio
 import re
 from textwrap import dedent
-from typing import Any
+from typing import Any, Mapping, NamedTuple
+from weakref import WeakKeyDictionary
 
 from discord import ButtonStyle, ui
 
+from jg.chick.lib.profiles import extract_profile_urls
+
 
 GREETER_ROLE_ID = 1062755787153358879
 
 THREAD_NAME_TEMPLATE = "Ahoj {author}!"
 
+INTRO_GREETING = (
+    "Píp, píp! Tady kuře, místní robot. "
+    "Vítej v klubu 👋"
+    "\n\n"
+    "Dík, že se představuješ! "
+    "Když o tobě víme víc, můžeme ti líp radit <:meowthumbsup:842730599906279494>"
+)
+
+INTRO_TIPS = (
+    "\n\n"
+    "Představení můžeš kdyžtak doplnit či změnit přes tři tečky a „Upravit zprávu“ 📝"
+    "\n\n"
+    # TODO https://github.com/juniorguru/juniorguru-chick/issues/12
+    "- Nevíš co dál? Popiš svou situaci do <#788826407412170752>\n"
+    "- Vybíráš kurz? Založ vlákno v <#1075052469303906335>\n"
+    "- Hledáš konkrétní recenze? Zkus vyhledávání\n"
+    "- Dotaz? Hurá do <#1067439203983568986>\n"
+    "- Záznamy přednášek? <#1169636415387205632>\n"
+    "- Něco jiného? <#769966887055392768> snese cokoliv\n"
+    "- Nevíš, jak to tady funguje? Ptej se v <#806215364379148348>"
+)
+
+INTRO_GITHUB_SNIPPET = (
+    "\n\n"
+    "Vidím, že máš **profil na GitHubu**. "
+    "Hoď ho do <#1123527619716055040> a dám ti na něj zpětnou vazbu. "
+    "Možná si už můžeš hledat práci přes [junior.guru/candidates](https://junior.guru/candidates/)?"
+    "<a:awkward:985064290044223488>"
+)
+
+INTRO_FOOTER = (
+    "\n\n"
+    "A nezapomeň, že junior.guru není jenom klub. "
+    "Tady aspoň dva odkazy, které fakt nechceš minout: "
+)
+
+INTRO_CONTENT = dedent(INTRO_GREETING + INTRO_TIPS + INTRO_FOOTER)
+
+INTRO_CONTENT_GITHUB = dedent(
+    INTRO_GREETING + INTRO_GITHUB_SNIPPET + INTRO_TIPS + INTRO_FOOTER
+)
+
+_intro_payloads: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[bool, dict[str, Any]]
+] = WeakKeyDictionary()
+
 PATTERNS_EMOJIS_MAPPING = {
     re.compile(r"\bpython\w*\b", re.I): [
         "<:python:842331892091322389>",
@@ -125,56 +175,103 @@ PATTERNS_EMOJIS_MAPPING = {
 }
 
 
+def get_pattern_keyword(pattern_re: re.Pattern) -> str:
+    """
+    Returns a literal which any text matching given pattern must contain
+
+    The literal is read from the beginning of the pattern, right after the
+    leading word boundary. If the pattern is case-insensitive, the literal
+    is casefolded. Empty string means the pattern can't be pre-filtered.
+    """
+    source = pattern_re.pattern.removeprefix(r"\b")
+    chars = []
+    index = 0
+    while index < len(source):
+        char = source[index]
+        if char == "\\" and index + 1 < len(source) and not source[index + 1].isalnum():
+            chars.append(source[index + 1])
+            index += 2
+        elif char.isalnum():
+            chars.append(char)
+            index += 1
+        else:
+            break
+    if chars and source[index : index + 1] in ("?", "*", "{"):
+        chars.pop()  # the last char is optional
+    keyword = "".join(chars)
+    return keyword.casefold() if pattern_re.flags & re.I else keyword
+
+
+class KeywordEmojis(NamedTuple):
+    pattern_re: re.Pattern
+    keyword: str
+    ignore_case: bool
+    emojis: list[str]
+
+
+KEYWORDS_EMOJIS = [
+    KeywordEmojis(
+        pattern_re=pattern_re,
+        keyword=get_pattern_keyword(pattern_re),
+        ignore_case=bool(pattern_re.flags & re.I),
+        emojis=emojis,
+    )
+    for pattern_re, emojis in PATTERNS_EMOJIS_MAPPING.items()
+]
+
+
 def choose_intro_emojis(intro_message_content: str) -> list[str]:
     """Returns a list of emoji reactions suitable for given message"""
+    return ["👋", "🐣", "👍"] + list(match_emojis(intro_message_content))
+
+
+def match_emojis(
+    text: str, keywords_emojis: list[KeywordEmojis] | None = None
+) -> set[str]:
+    """
+    Returns emojis of all patterns matching given text
+
+    Instead of running every pattern over the whole text, the text gets
+    casefolded once and each pattern is only run if its keyword is present,
+    starting at the first occurrence of the keyword.
+    """
+    text_folded = text.casefold()
+    same_positions = len(text_folded) == len(text)
     emojis = set()
-    for pattern_re, pattern_emojis in PATTERNS_EMOJIS_MAPPING.items():
-        if pattern_re.search(intro_message_content):
-            emojis.update(pattern_emojis)
-    return ["👋", "🐣", "👍"] + list(emojis)
-
-
-def generate_intro_message(intro_message_content: str) -> dict[str, Any]:
-    greeting = (
-        "Píp, píp! Tady kuře, místní robot. "
-        "Vítej v klubu 👋"
-        "\n\n"
-        "Dík, že se představuješ! "
-        "Když o tobě víme víc, můžeme ti líp radit <:meowthumbsup:842730599906279494>"
-    )
-    tips = (
-        "\n\n"
-        "Představení můžeš kdyžtak doplnit či změnit přes tři tečky a „Upravit zprávu“ 📝"
-        "\n\n"
-        # TODO https://github.com/juniorguru/juniorguru-chick/issues/12
-        "- Nevíš co dál? Popiš svou situaci do <#788826407412170752>\n"
-        "- Vybíráš kurz? Založ vlákno v <#1075052469303906335>\n"
-        "- Hledáš konkrétní recenze? Zkus vyhledávání\n"
-        "- Dotaz? Hurá do <#1067439203983568986>\n"
-        "- Záznamy přednášek? <#1169636415387205632>\n"
-        "- Něco jiného? <#769966887055392768> snese cokoliv\n"
-        "- Nevíš, jak to tady funguje? Ptej se v <#806215364379148348>"
-    )
-    gh_connection_snippet = (
-        "\n\n"
-        "Vidím, že máš **profil na GitHubu**. "
-        "Hoď ho do <#1123527619716055040> a dám ti na něj zpětnou vazbu. "
-        "Možná si už můžeš hledat práci přes [junior.guru/candidates](https://junior.guru/candidates/)?"
-        "<a:awkward:985064290044223488>"
-    )
-    footer = (
-        "\n\n"
-        "A nezapomeň, že junior.guru není jenom klub. "
-        "Tady aspoň dva odkazy, které fakt nechceš minout: "
-    )
+    for item in KEYWORDS_EMOJIS if keywords_emojis is None else keywords_emojis:
+        index = (text_folded if item.ignore_case else text).find(item.keyword)
+        if index == -1:
+            continue
+        if item.ignore_case and not same_positions:
+            index = 0
+        if item.pattern_re.search(text, index):
+            emojis.update(item.emojis)
+    return emojis
+
+
+def generate_intro_message(intro_message_content: str) -> Mapping[str, Any]:
+    """
+    Returns a ready payload for the intro message
+
+    The payload is shared across calls, so it must not be modified.
+    """
+    has_github = bool(extract_profile_urls(intro_message_content).github)
+    loop = asyncio.get_running_loop()
+    try:
+        payloads = _intro_payloads[loop]
+    except KeyError:
+        payloads = _intro_payloads[loop] = prepare_intro_payloads()
+    return payloads[has_github]
+
 
-    # Compose the greeting message depending on the intro message content
-    content = greeting
-    if "github.com/" in intro_message_content:
-        content = content + gh_connection_snippet
-    content = content + tips + footer
-    content = dedent(content)
+def prepare_intro_payloads() -> dict[bool, dict[str, Any]]:
+    """
+    Prepares intro message payloads, keyed by whether the intro mentions GitHub
 
+    The view only contains link buttons, which have no callbacks and are never
+    stored by Discord's view store, so a single instance can be sent many times.
+    It has to be created inside a running event loop though.
+    """
     view = ui.View(
         ui.Button(
             emoji="📖",
@@ -188,5 +285,9 @@ def generate_intro_message(intro_message_content: str) -> dict[str, Any]:
             url="https://junior.guru/news/",
             style=ButtonStyle.secondary,
         ),
+        timeout=None,
     )
-    return dict(content=content, view=view)
+    return {
+        False: dict(content=INTRO_CONTENT, view=view),
+        True: dict(content=INTRO_CONTENT_GITHUB, view=view),
+    }
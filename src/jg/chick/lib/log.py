@@ -0,0 +1,107 @@
+import logging
+import queue
+import sys
+import time
+from datetime import timedelta
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
+
+
+LOG_FORMAT = logging.BASIC_FORMAT
+
+RATE_LIMIT_BURST = 10
+
+RATE_LIMIT_INTERVAL = timedelta(seconds=10)
+
+RATE_LIMIT_MESSAGES_MAX = 1000
+
+STRUCTURED_FIELDS = ["event", "channel_id", "thread_id", "duration", "suppressed"]
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records to a queue without formatting them
+
+    The standard handler formats the message before putting the record to
+    the queue, which would happen in the event loop. The queue only ever gets
+    read in the same process, so the formatting can wait for the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through only a burst of records with the same message per interval
+
+    Records are told apart by their logger and unformatted message, so
+    messages must be logged with %-style arguments for this to work, and
+    f-strings only ever get rate-limited when repeated exactly. Warnings
+    and errors always pass. The first record let through after some got
+    dropped says how many.
+    """
+
+    def __init__(
+        self, burst: int = RATE_LIMIT_BURST, interval: timedelta = RATE_LIMIT_INTERVAL
+    ):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: dict[tuple[str, str], tuple[float, int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        if key not in self._windows and len(self._windows) >= RATE_LIMIT_MESSAGES_MAX:
+            self._windows = {
+                window_key: window
+                for window_key, window in self._windows.items()
+                if now - window[0] < self.interval.total_seconds()
+            }
+        started_at, count, suppressed = self._windows.get(key, (now, 0, 0))
+        if now - started_at >= self.interval.total_seconds():
+            started_at, count = now, 0
+        if count >= self.burst:
+            self._windows[key] = (started_at, count, suppressed + 1)
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+        self._windows[key] = (started_at, count + 1, 0)
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends structured fields passed as extra to the message, if any"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = [
+            f"{name}={getattr(record, name)}"
+            for name in STRUCTURED_FIELDS
+            if getattr(record, name, None) is not None
+        ]
+        return f"{text} [{' '.join(fields)}]" if fields else text
+
+
+def setup_logging(stream: TextIO | None = None) -> QueueListener:
+    """
+    Sends all logs through a queue to a background thread, which writes them
+
+    Returns the started listener, which should be stopped at exit so that
+    the remaining records get written.
+    """
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    stream_handler = logging.StreamHandler(stream or sys.stderr)
+    stream_handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(queue_handler)
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
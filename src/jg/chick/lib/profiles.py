@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable
+from urllib.parse import quote, unquote
+
+import aiohttp
+from discord import Attachment
+
+from jg.chick.lib import http
+
+
+EGGTRAY_API_URL = "https://juniorguru.github.io/eggtray/profiles.json"
+
+PROFILES_TTL = timedelta(minutes=30)
+
+GITHUB_URL_RE = re.compile(r"github\.com/(?P<username>[\w-]+)")
+
+# starts with a literal, because that's what the regex engine can search for
+# quickly, unlike an alternation of the two URL patterns
+PROFILE_URL_RE = re.compile(
+    r"\.com/(?:"
+    r"(?<=github\.com/)(?P<github_username>[\w-]+)"
+    r"|(?<=linkedin\.com/)in/(?P<linkedin_username>[^\s\/]+)"
+    r")"
+)
+
+CV_CONTENT_TYPE = "application/pdf"
+
+
+logger = logging.getLogger("jg.chick.profiles")
+
+
+@dataclass(frozen=True)
+class ProfileURLs:
+    github: tuple[str, ...] = ()
+    linkedin: tuple[str, ...] = ()
+    cv: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.github or self.linkedin or self.cv)
+
+
+def normalize_username(username: str) -> str:
+    # GitHub usernames are case-insensitive
+    return username.casefold()
+
+
+def extract_profile_urls(
+    text: str, attachments: Iterable[Attachment] = ()
+) -> ProfileURLs:
+    """
+    Returns all GitHub, LinkedIn and CV links found in given post
+
+    The text is scanned only once. Links are normalized and deduplicated,
+    in order of appearance.
+    """
+    github_urls: dict[str, str] = {}
+    linkedin_urls: dict[str, str] = {}
+    # people often repeat the same link, so it's worth skipping exact duplicates
+    # before normalizing
+    matches = dict.fromkeys(PROFILE_URL_RE.findall(text))
+    for github_username, linkedin_username in matches:
+        if github_username:
+            github_urls.setdefault(
+                normalize_username(github_username),
+                f"https://github.com/{github_username}/",
+            )
+        else:
+            username = quote(unquote(linkedin_username))
+            url = f"https://www.linkedin.com/in/{username}/"
+            linkedin_urls.setdefault(url.casefold(), url)
+    cv_urls = dict.fromkeys(
+        attachment.url
+        for attachment in attachments
+        if attachment.content_type == CV_CONTENT_TYPE
+    )
+    return ProfileURLs(
+        github=tuple(github_urls.values()),
+        linkedin=tuple(linkedin_urls.values()),
+        cv=tuple(cv_urls),
+    )
+
+
+class ProfilesIndex:
+    """
+    Set of GitHub usernames of candidates with a profile at junior.guru
+
+    Meant to be refreshed in the background, so that reviews only do a set
+    lookup. Uses ETag and Last-Modified headers to make conditional requests.
+    Only the usernames are kept, the rest of the payload is thrown away right
+    after parsing. If a refresh fails, the last known usernames stay in place.
+    """
+
+    def __init__(
+        self, eggtray_api_url: str = EGGTRAY_API_URL, ttl: timedelta = PROFILES_TTL
+    ):
+        self.eggtray_api_url = eggtray_api_url
+        self._conditional_get = http.ConditionalGet(eggtray_api_url)
+        self.ttl = ttl
+        self.usernames: frozenset[str] = frozenset()
+        self._refreshed_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.usernames)
+
+    def __contains__(self, username: str | None) -> bool:
+        if not username:
+            return False
+        return normalize_username(username) in self.usernames
+
+    @property
+    def is_stale(self) -> bool:
+        return self._refreshed_at is None or (
+            time.monotonic() - self._refreshed_at >= self.ttl.total_seconds()
+        )
+
+    async def refresh(self, session: aiohttp.ClientSession | None = None) -> bool:
+        """Returns True if the usernames are up to date with the API"""
+        async with self._lock:
+            try:
+                async with http.use_session(session) as http_session:
+                    await self._refresh(http_session)
+            except (aiohttp.ClientError, TimeoutError, ValueError, KeyError, TypeError):
+                logger.exception(f"Failed to refresh profiles, keeping {len(self)}")
+                return False
+            self._refreshed_at = time.monotonic()
+            return True
+
+    async def _refresh(self, session: aiohttp.ClientSession) -> None:
+        if (api_payload := await self._conditional_get.fetch_json(session)) is None:
+            logger.info("Profiles not modified")
+            return
+        self.usernames = parse_usernames(api_payload)
+        logger.info(f"Found {len(self.usernames)} profiles")
+
+
+def parse_usernames(api_payload: dict) -> frozenset[str]:
+    return frozenset(
+        normalize_username(item["github_username"])
+        for item in api_payload["items"]
+        if item.get("github_username")
+    )
@@ -1,12 +1,25 @@
+import asyncio
+import logging
 import os
 import re
-from typing import Any, Generator
-from urllib.parse import quote, unquote
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Any, Awaitable, Callable, Generator, Iterable, NamedTuple, cast
 
-from discord import Attachment, Color, Embed, ForumTag, Thread
+import aiohttp
+from discord import Attachment, Color, Embed, ForumChannel, ForumTag, Thread
 from jg.eggtray.models import is_ready
+from jg.hen.core import check_profile_url
 from jg.hen.models import Status, Summary
 
+from jg.chick.lib import http
+from jg.chick.lib.cache import LRUCache
+from jg.chick.lib.profiles import (
+    GITHUB_URL_RE,
+    extract_profile_urls,
+    normalize_username,
+)
+
 
 MAINTAINER_ID = 668226181769986078
 
@@ -14,9 +27,75 @@ REVIEWER_ROLE_ID = 1075044541796716604
 
 GITHUB_API_KEY = os.getenv("GITHUB_API_KEY") or None
 
-GITHUB_URL_RE = re.compile(r"github\.com/(?P<username>[\w-]+)")
+GITHUB_API_URL = "https://api.github.com"
+
+# rough estimate of how many GitHub API requests a single review makes
+GITHUB_REVIEW_COST = 30
+
+GITHUB_RATE_LIMIT_CHECK_INTERVAL = timedelta(minutes=1)
+
+CV_TAG_NAME = "zpětná vazba na CV"
+
+GITHUB_TAG_NAME = "zpětná vazba na GH"
+
+LINKEDIN_TAG_NAME = "zpětná vazba na LI"
+
+REVIEW_TAGS_NAMES = [CV_TAG_NAME, GITHUB_TAG_NAME, LINKEDIN_TAG_NAME]
+
+MESSAGE_CONTENT_LIMIT = 2000
+
+MESSAGE_EMBEDS_LIMIT = 10
+
+MESSAGE_EMBEDS_LENGTH_LIMIT = 6000
+
+REVIEW_WORKERS = 2
+
+REVIEW_QUEUE_SIZE = 20
+
+SUMMARIES_CACHE_SIZE = 256
+
+SUMMARIES_CACHE_TTL = timedelta(hours=6)
+
+RECHECK_RE = re.compile(r"\b(znovu|recheck)\b", re.I)
+
+CV_REPLY_CONTENT = (
+    "📝 Zavětřilo jsem CV"
+    "\n\n"
+    "🙏 Na CV zatím zpětnou vazbu dávat neumím, ale třeba pomůže někdo jiný"
+    "\n\n"
+    "💡 Přečti si [návod na CV](https://junior.guru/handbook/cv/) v příručce, ušetříš spoustu času sobě i nám! "
+    "Ve zpětné vazbě nebudeme muset opakovat rady z návodu a budeme se moci soustředit na to podstatné."
+)
+
+GITHUB_REPLY_TEMPLATE = (
+    "<:github:842685206095724554> Zavětřilo jsem [GitHub profil]({github_url}), jdu se v tom pohrabat…"
+    "\n\n"
+    "💡 Přečti si [návod na GitHub profil](https://junior.guru/handbook/github-profile/) v příručce, pochopíš kontext mých doporučení."
+)
+
+QUEUE_FULL_CONTENT = (
+    "🐤 Píp! Teď toho mám na zpracování nějak moc. "
+    "Zkus mě tady za chvíli označit a kouknu na to."
+)
+
+GITHUB_DEFERRED_TEMPLATE = (
+    "⏳ Píp! Vyčerpalo jsem limit dotazů na GitHub. "
+    "Na [GitHub profil]({github_url}) kouknu v <t:{timestamp}:t>, vydrž prosím."
+)
+
+LINKEDIN_REPLY_TEMPLATE = (
+    "<:linkedin:915267970752712734> Zavětřilo jsem [LinkedIn profil]({linkedin_url})"
+    "\n\n"
+    "🙏 Na LinkedIn zatím zpětnou vazbu dávat neumím, ale třeba pomůže někdo jiný"
+    "\n\n"
+    "💡 Přidej se do [naší LinkedIn skupiny](https://www.linkedin.com/groups/13988090/). "
+    "Můžeš se pak snadno propojit s ostatními členy a oni s tebou. "
+    "Zároveň se ti bude logo junior.guru zobrazovat na profilu v sekci „zájmy”. "
+    "Nevíme, jestli ti to přidá nějaký kredit u recruiterů, ale vyloučeno to není!"
+)
+
+logger = logging.getLogger("jg.chick.reviews")
 
-LINKEDIN_URL_RE = re.compile(r"linkedin\.com/in/(?P<username>[^\s\/]+)")
 
 COLORS = {
     Status.ERROR: Color.red(),
@@ -27,24 +106,352 @@ COLORS = {
 
 
 def find_cv_url(attachments: list[Attachment]) -> str | None:
-    for attachment in attachments:
-        if attachment.content_type == "application/pdf":
-            return attachment.url
-    return None
+    return next(iter(extract_profile_urls("", attachments).cv), None)
 
 
 def find_github_url(text: str) -> str | None:
-    if match := GITHUB_URL_RE.search(text):
-        username = match.group("username")
-        return f"https://github.com/{username}/"
-    return None
+    return next(iter(extract_profile_urls(text).github), None)
 
 
 def find_linkedin_url(text: str) -> str | None:
-    if match := LINKEDIN_URL_RE.search(text):
-        username = quote(unquote(match.group("username")))
-        return f"https://www.linkedin.com/in/{username}/"
-    return ""
+    return next(iter(extract_profile_urls(text).linkedin), None)
+
+
+class ReviewQueue:
+    """
+    Runs reviews in the background by a fixed number of workers
+
+    Event handlers only submit reviews, so a slow review can't hold them up.
+    The queue is bounded and submitting to a full queue fails right away,
+    so that a burst of reviews can't pile up without limit.
+    """
+
+    def __init__(self, workers: int = REVIEW_WORKERS, maxsize: int = REVIEW_QUEUE_SIZE):
+        self.workers = workers
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._queue: asyncio.Queue[tuple[float, Callable[[], Awaitable[None]]]] = (
+            asyncio.Queue(maxsize)
+        )
+        self._tasks: list[asyncio.Task] = []
+        self._delayed: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(number)) for number in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, *self._delayed]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        await asyncio.gather(*self._delayed)
+        await self._queue.join()
+
+    def submit(self, job: Callable[[], Awaitable[None]]) -> bool:
+        try:
+            self._queue.put_nowait((time.monotonic(), job))
+        except asyncio.QueueFull:
+            logger.warning(f"Review queue is full ({len(self)} waiting)")
+            return False
+        logger.info(f"Review queued ({len(self)} waiting)")
+        return True
+
+    def submit_later(
+        self, job: Callable[[], Awaitable[None]], delay: timedelta
+    ) -> None:
+        """Submits given job after given delay, waiting for the queue if it's full"""
+        task = asyncio.create_task(self._submit_later(job, delay))
+        self._delayed.add(task)
+        task.add_done_callback(self._delayed.discard)
+
+    async def _submit_later(
+        self, job: Callable[[], Awaitable[None]], delay: timedelta
+    ) -> None:
+        await asyncio.sleep(delay.total_seconds())
+        await self._queue.put((time.monotonic(), job))
+        logger.info(f"Delayed review queued ({len(self)} waiting)")
+
+    async def _work(self, number: int) -> None:
+        while True:
+            submitted_at, job = await self._queue.get()
+            wait = time.monotonic() - submitted_at
+            self.processed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            logger.info(
+                f"Worker #{number} starts review after waiting {wait:.1f}s "
+                f"({len(self)} waiting, {self.max_wait:.1f}s max wait)"
+            )
+            started_at = time.monotonic()
+            try:
+                await job()
+            except Exception:
+                logger.exception("Failed to review")
+            finally:
+                self._queue.task_done()
+                logger.info(
+                    "Worker #%d finished review",
+                    number,
+                    extra={
+                        "event": "review",
+                        "duration": f"{time.monotonic() - started_at:.1f}s",
+                    },
+                )
+
+
+class GitHubRateBudget:
+    """
+    Keeps track of how many GitHub API requests are left
+
+    The profile checks make their own requests, so the budget can't learn
+    about the quota from their responses. It asks the rate limit endpoint
+    instead, which doesn't count against the quota, at most once per
+    check_interval. In between, each granted review is subtracted from the
+    last known quota, so that a burst of reviews can't overdraw it.
+    """
+
+    def __init__(
+        self,
+        github_api_url: str = GITHUB_API_URL,
+        github_api_key: str | None = GITHUB_API_KEY,
+        review_cost: int = GITHUB_REVIEW_COST,
+        check_interval: timedelta = GITHUB_RATE_LIMIT_CHECK_INTERVAL,
+    ):
+        self.github_api_url = github_api_url
+        self.github_api_key = github_api_key
+        self.review_cost = review_cost
+        self.check_interval = check_interval
+        self.remaining: int | None = None
+        self.reset_at: datetime | None = None
+        self._checked_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def record(self, remaining: int, reset: int) -> None:
+        self.remaining = remaining
+        self.reset_at = datetime.fromtimestamp(reset, UTC)
+        self._checked_at = time.monotonic()
+
+    @property
+    def is_stale(self) -> bool:
+        if self._checked_at is None or (
+            self.reset_at and datetime.now(UTC) >= self.reset_at
+        ):
+            return True
+        return (
+            time.monotonic() - self._checked_at >= self.check_interval.total_seconds()
+        )
+
+    async def update(self, session: aiohttp.ClientSession | None = None) -> None:
+        headers = get_github_headers(self.github_api_key)
+        url = f"{self.github_api_url}/rate_limit"
+        async with (
+            http.use_session(session) as http_session,
+            http_session.get(url, headers=headers, raise_for_status=True) as resp,
+        ):
+            core = (await resp.json())["resources"]["core"]
+            self.record(core["remaining"], core["reset"])
+
+    async def reserve(
+        self, session: aiohttp.ClientSession | None = None
+    ) -> datetime | None:
+        """Returns None if there's budget for a review, otherwise when there will be"""
+        async with self._lock:
+            if self.is_stale:
+                try:
+                    await self.update(session)
+                except (aiohttp.ClientError, TimeoutError, KeyError, TypeError):
+                    # not knowing the budget shouldn't stop the review
+                    logger.exception("Failed to check GitHub rate limit")
+                    return None
+            if self.remaining is not None and self.remaining < self.review_cost:
+                logger.warning(
+                    f"GitHub rate limit low ({self.remaining} left), "
+                    f"resets at {self.reset_at}"
+                )
+                return self.reset_at
+            if self.remaining is not None:
+                self.remaining -= self.review_cost
+            return None
+
+
+def get_github_headers(github_api_key: str | None = GITHUB_API_KEY) -> dict[str, str]:
+    headers = {"Accept": "application/vnd.github+json"}
+    if github_api_key:
+        headers["Authorization"] = f"Bearer {github_api_key}"
+    return headers
+
+
+class CachedSummary(NamedTuple):
+    summary: Summary
+    version: str | None
+
+
+class GitHubRateLimited(Exception):
+    """Raised instead of reviewing if there's not enough GitHub API budget left"""
+
+    def __init__(self, reset_at: datetime | None):
+        super().__init__(f"GitHub rate limit low until {reset_at}")
+        self.reset_at = reset_at
+
+
+class SummariesCache(LRUCache[str, CachedSummary]):
+    """
+    Results of GitHub profile reviews by normalized username
+
+    Each review is kept together with the version of the profile it was made
+    for, see fetch_profile_version().
+    """
+
+    def __init__(
+        self, maxsize: int = SUMMARIES_CACHE_SIZE, ttl: timedelta = SUMMARIES_CACHE_TTL
+    ):
+        super().__init__(maxsize, ttl)
+
+
+def is_recheck_requested(text: str) -> bool:
+    return bool(RECHECK_RE.search(text))
+
+
+async def fetch_profile_version(
+    username: str,
+    session: aiohttp.ClientSession | None = None,
+    github_api_url: str = GITHUB_API_URL,
+    github_api_key: str | None = GITHUB_API_KEY,
+) -> str | None:
+    """
+    Returns a value which changes whenever given GitHub profile changes
+
+    It's made of when the user last updated their profile and when they last
+    pushed to any of their repositories. That takes two API requests, which
+    is much cheaper than a review. Returns None if the version is unknown.
+    """
+    headers = get_github_headers(github_api_key)
+    user_url = f"{github_api_url}/users/{username}"
+    try:
+        async with http.use_session(session) as http_session:
+            async with http_session.get(
+                user_url, headers=headers, raise_for_status=True
+            ) as resp:
+                updated_at = (await resp.json())["updated_at"]
+            async with http_session.get(
+                f"{user_url}/repos",
+                params={"sort": "pushed", "per_page": "1"},
+                headers=headers,
+                raise_for_status=True,
+            ) as resp:
+                repos = await resp.json()
+                pushed_at = repos[0]["pushed_at"] if repos else ""
+    except (aiohttp.ClientError, TimeoutError, ValueError, KeyError, TypeError):
+        logger.exception(f"Failed to fetch version of GitHub profile {username}")
+        return None
+    return f"{updated_at}/{pushed_at}"
+
+
+async def review_github_profile(
+    github_url: str,
+    summaries: SummariesCache | None = None,
+    recheck: bool = False,
+    session: aiohttp.ClientSession | None = None,
+    github_budget: GitHubRateBudget | None = None,
+) -> Summary:
+    """
+    Returns a review of given GitHub profile, possibly a recent one
+
+    A recent review is reused only if the profile hasn't changed since, or if
+    it can't be told whether it has. The recheck flag skips the cached review
+    altogether, e.g. if someone asks to review the profile again. Reviews
+    which ended up with an error aren't cached, as the error is likely
+    temporary. The budget gets charged only if the profile actually needs
+    a review, and if there isn't enough of it, GitHubRateLimited is raised.
+    """
+    if summaries is None:
+        await reserve_review(github_budget, session)
+        return await check_profile_url(github_url, github_api_key=GITHUB_API_KEY)
+
+    match = GITHUB_URL_RE.search(github_url)
+    username = match.group("username") if match else None
+    key = normalize_username(username or github_url)
+    version = await fetch_profile_version(username, session) if username else None
+    if not recheck and (cached := summaries.get(key)):
+        if version is None or version == cached.version:
+            logger.info(
+                f"Reusing review of {github_url} ({summaries.hits} hits so far)"
+            )
+            return cached.summary
+        logger.info(f"Profile {github_url} changed since the last review")
+
+    await reserve_review(github_budget, session)
+    summary = await check_profile_url(github_url, github_api_key=GITHUB_API_KEY)
+    if summary.error:
+        summaries.pop(key)
+    else:
+        summaries.set(key, CachedSummary(summary, version))
+    logger.info(
+        f"Reviewed {github_url} (cache: {summaries.hits} hits, {summaries.misses} misses)"
+    )
+    return summary
+
+
+async def reserve_review(
+    github_budget: GitHubRateBudget | None,
+    session: aiohttp.ClientSession | None = None,
+) -> None:
+    if github_budget and (reset_at := await github_budget.reserve(session)):
+        raise GitHubRateLimited(reset_at)
+
+
+class ForumTagsIndex:
+    """
+    Keeps tags of each forum channel by name
+
+    The index of a channel gets built on first use and should be forgotten
+    whenever the channel gets updated, as its tags might have changed.
+    """
+
+    def __init__(self):
+        self._tags: dict[int, dict[str, ForumTag]] = {}
+
+    def get(self, channel: ForumChannel) -> dict[str, ForumTag]:
+        try:
+            return self._tags[channel.id]
+        except KeyError:
+            tags = self._tags[channel.id] = {
+                tag.name: tag for tag in channel.available_tags
+            }
+            return tags
+
+    def forget(self, channel_id: int) -> None:
+        self._tags.pop(channel_id, None)
+
+
+def get_tags(
+    channel: ForumChannel, forum_tags: ForumTagsIndex | None = None
+) -> dict[str, ForumTag]:
+    if forum_tags:
+        return forum_tags.get(channel)
+    return {tag.name: tag for tag in channel.available_tags}
+
+
+def find_missing_tags(
+    channel: ForumChannel,
+    tags_names: list[str] = REVIEW_TAGS_NAMES,
+    forum_tags: ForumTagsIndex | None = None,
+) -> list[str]:
+    available_tags = get_tags(channel, forum_tags)
+    return [tag_name for tag_name in tags_names if tag_name not in available_tags]
 
 
 def prepare_tags(
@@ -52,15 +459,21 @@ def prepare_tags(
     cv: bool = False,
     github: bool = False,
     linkedin: bool = False,
+    forum_tags: ForumTagsIndex | None = None,
 ) -> list[ForumTag]:
-    available_tags = {tag.name: tag for tag in thread.parent.available_tags}
+    channel = cast(ForumChannel, thread.parent)
+    available_tags = get_tags(channel, forum_tags)
     applied_tags = set(thread.applied_tags)
-    if cv:
-        applied_tags.add(available_tags.pop("zpětná vazba na CV"))
-    if github:
-        applied_tags.add(available_tags.pop("zpětná vazba na GH"))
-    if linkedin:
-        applied_tags.add(available_tags.pop("zpětná vazba na LI"))
+    for tag_name, is_applied in [
+        (CV_TAG_NAME, cv),
+        (GITHUB_TAG_NAME, github),
+        (LINKEDIN_TAG_NAME, linkedin),
+    ]:
+        if is_applied:
+            if tag := available_tags.get(tag_name):
+                applied_tags.add(tag)
+            else:
+                logger.error(f"Tag {tag_name!r} not found in {channel.name!r}")
     return list(applied_tags)
 
 
@@ -112,3 +525,58 @@ def format_summary(
                 "Až uděláš změny, stačí mě označit v tomto vlákně a projedu to znova 🔬"
             ),
         )
+
+
+def pack_messages(
+    messages: Iterable[dict[str, Any]],
+) -> Generator[dict[str, Any], None, None]:
+    """
+    Merges messages so that they can be sent using fewer API calls
+
+    Embeds join the previous message, and so do texts following a text with
+    the same options, as long as the result fits the Discord limits. Because
+    Discord displays text above embeds, a text following an embed always
+    starts a new message. Order of texts and embeds stays the same.
+    """
+    packed: dict[str, Any] | None = None
+    for message in messages:
+        message = dict(message)
+        if embed := message.pop("embed", None):
+            message["embeds"] = [*message.get("embeds", []), embed]
+        if packed is None:
+            packed = message
+        elif can_pack(packed, message):
+            if content := message.get("content"):
+                packed["content"] = (
+                    f"{packed['content']}\n\n{content}"
+                    if packed.get("content")
+                    else content
+                )
+            if embeds := message.get("embeds"):
+                packed["embeds"] = [*packed.get("embeds", []), *embeds]
+        else:
+            yield packed
+            packed = message
+    if packed is not None:
+        yield packed
+
+
+def can_pack(message: dict[str, Any], next_message: dict[str, Any]) -> bool:
+    options = (message.keys() | next_message.keys()) - {"content", "embeds"}
+    if any(message.get(key) != next_message.get(key) for key in options):
+        return False
+
+    embeds = message.get("embeds", [])
+    next_embeds = next_message.get("embeds", [])
+    if next_message.get("content"):
+        if embeds:
+            return False
+        content_length = (
+            len(message.get("content") or "") + len(next_message["content"]) + 2
+        )
+        if content_length > MESSAGE_CONTENT_LIMIT:
+            return False
+    if len(embeds) + len(next_embeds) > MESSAGE_EMBEDS_LIMIT:
+        return False
+    embeds_length = sum(len(embed) for embed in embeds + next_embeds)
+    return embeds_length <= MESSAGE_EMBEDS_LENGTH_LIMIT
@@ -0,0 +1,53 @@
+import discord
+
+
+class RoleMembersIndex:
+    """
+    Keeps IDs of members of each role
+
+    Discord's role.members scans all cached members of the guild every time.
+    This index gets built once per guild and then kept up to date by the member
+    events, so looking up members of a role only costs the size of the role.
+    Guilds which haven't been indexed fall back to the Discord's cache.
+    """
+
+    def __init__(self):
+        self._members_ids: dict[int, set[int]] = {}
+        self._guilds_ids: set[int] = set()
+
+    def index_guild(self, guild: discord.Guild) -> None:
+        for role in guild.roles:
+            if not role.is_default():
+                self._members_ids[role.id] = set()
+        for member in guild.members:
+            self.add_member(member)
+        self._guilds_ids.add(guild.id)
+
+    def add_member(self, member: discord.Member) -> None:
+        for role in member.roles:
+            if not role.is_default():
+                self._members_ids.setdefault(role.id, set()).add(member.id)
+
+    def remove_member(self, member: discord.Member) -> None:
+        for role in member.roles:
+            if members_ids := self._members_ids.get(role.id):
+                members_ids.discard(member.id)
+
+    def update_member(self, before: discord.Member, after: discord.Member) -> None:
+        if before.roles != after.roles:
+            self.remove_member(before)
+            self.add_member(after)
+
+    def remove_role(self, role_id: int) -> None:
+        self._members_ids.pop(role_id, None)
+
+    def get_members(
+        self, guild: discord.Guild, role: discord.Role
+    ) -> list[discord.Member]:
+        if guild.id not in self._guilds_ids:
+            return role.members
+        return [
+            member
+            for member_id in self._members_ids.get(role.id, ())
+            if (member := guild.get_member(member_id))
+        ]
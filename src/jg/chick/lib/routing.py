@@ -0,0 +1,54 @@
+import logging
+from typing import Any, Awaitable, Callable, TypeVar
+
+import discord
+
+
+Handler = TypeVar("Handler", bound=Callable[..., Awaitable[Any]])
+
+
+logger = logging.getLogger("jg.chick.routing")
+
+
+class ChannelRoutes:
+    """
+    Maps channels to their handlers
+
+    Handlers get registered by channel name, but looking them up is by channel
+    ID, so that it's a single dict lookup for each incoming event. The IDs get
+    resolved for each guild once and then kept up to date by the channel
+    events.
+    """
+
+    def __init__(self):
+        self._handlers_by_name: dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._handlers: dict[int, Callable[..., Awaitable[Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+    def route(self, channel_name: str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            self._handlers_by_name[channel_name] = handler
+            return handler
+
+        return decorator
+
+    def get(self, channel_id: int) -> Callable[..., Awaitable[Any]] | None:
+        return self._handlers.get(channel_id)
+
+    def index_guild(self, guild: discord.Guild) -> None:
+        for channel in guild.channels:
+            self.add_channel(channel)
+
+    def add_channel(self, channel: discord.abc.GuildChannel) -> None:
+        if handler := self._handlers_by_name.get(channel.name):
+            logger.debug(f"Routing #{channel.name} ({channel.id}) to {handler}")
+            self._handlers[channel.id] = handler
+
+    def remove_channel(self, channel_id: int) -> None:
+        self._handlers.pop(channel_id, None)
+
+    def update_channel(self, channel: discord.abc.GuildChannel) -> None:
+        self.remove_channel(channel.id)
+        self.add_channel(channel)
@@ -1,24 +1,28 @@
-import re
+import asyncio
+import logging
+import time
 from datetime import UTC, datetime, timedelta
 
 import discord
 
+from jg.chick.lib.cache import LRUCache
+from jg.chick.lib.roles import RoleMembersIndex
+
+
+THREAD_MEMBER_COUNT_CAP = 50
+
+ROLE_PING_WINDOW = timedelta(minutes=1)
+
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+
+BULK_DELETE_MAX_COUNT = 100
 
 DAYS = ["Pondělní", "Úterní", "Středeční", "Čtvrteční", "Páteční", "Sobotní", "Nedělní"]
 
-BRACKETS_RE = re.compile(
-    r"""
-        ^
-        \[     # starts with [
-            (?P<bracket_content>
-                .*      # any number of any characters
-                [^\s]   # not a whitespace
-                [^\]]   # not a closing bracket
-            )
-        \]     # ends with ]
-    """,
-    re.VERBOSE,
-)
+BRACKET_CONTENT_MAX_LENGTH = 100  # Discord's limit for thread names
+
+
+logger = logging.getLogger("jg.chick.threads")
 
 
 def is_thread_created(message: discord.Message) -> bool:
@@ -26,10 +30,55 @@ def is_thread_created(message: discord.Message) -> bool:
     return message.type == discord.MessageType.thread_created
 
 
-async def fetch_starting_message(thread: discord.Thread) -> discord.Message | None:
+class StartingMessagesCache:
+    """
+    Keeps recently fetched starting messages of threads
+
+    Concurrent lookups of the same thread share a single request. Entries
+    should be dropped whenever the message gets edited or deleted.
+    """
+
+    def __init__(self, maxsize: int = 100):
+        self._messages: LRUCache[int, discord.Message] = LRUCache(maxsize)
+        self._pending: dict[int, asyncio.Task[discord.Message | None]] = {}
+
+    async def fetch(self, thread: discord.Thread) -> discord.Message | None:
+        if message := self._messages.get(thread.id):
+            return message
+        if not (task := self._pending.get(thread.id)):
+            task = asyncio.create_task(self._fetch(thread))
+            self._pending[thread.id] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, thread: discord.Thread) -> discord.Message | None:
+        task = asyncio.current_task()
+        try:
+            message = await _fetch_starting_message(thread)
+            # the entry could have been dropped while the request was in flight
+            if message and self._pending.get(thread.id) is task:
+                self._messages.set(thread.id, message)
+            return message
+        finally:
+            if self._pending.get(thread.id) is task:
+                del self._pending[thread.id]
+
+    def forget(self, thread_id: int) -> None:
+        self._messages.pop(thread_id)
+        self._pending.pop(thread_id, None)
+
+
+async def fetch_starting_message(
+    thread: discord.Thread, starting_messages: StartingMessagesCache | None = None
+) -> discord.Message | None:
     """Returns the starting message of given thread"""
     if thread.starting_message:
         return thread.starting_message
+    if starting_messages:
+        return await starting_messages.fetch(thread)
+    return await _fetch_starting_message(thread)
+
+
+async def _fetch_starting_message(thread: discord.Thread) -> discord.Message | None:
     try:
         # thread.starting_message is often None although the thread
         # has a starting message, so try to fetch it manually
@@ -47,8 +96,7 @@ def name_thread(
     If the message includes text in square brackets, use that as name for the thread.
     Otherwise, use the provided name template.
     """
-    if bracket_name_template and (match := BRACKETS_RE.match(message.content)):
-        content = match.group("bracket_content")
+    if bracket_name_template and (content := parse_bracket_content(message.content)):
         parts = content.split(",")
         words = []
         for part in parts:
@@ -65,9 +113,38 @@ def name_thread(
     )
 
 
-async def ensure_thread_name(thread: discord.Thread, name_template) -> str | None:
+def parse_bracket_content(
+    text: str, max_length: int = BRACKET_CONTENT_MAX_LENGTH
+) -> str | None:
+    """
+    Returns content of the square brackets the text starts with
+
+    The content spans from the opening bracket to the last closing bracket
+    on the first line. It must be at least two characters long, its second
+    to last character mustn't be a whitespace and its last character mustn't
+    be a closing bracket. Only the first max_length characters of the content
+    are considered, so the time it takes doesn't depend on the text length.
+    """
+    if not text.startswith("["):
+        return None
+    text = text[: max_length + 2]
+    newline_index = text.find("\n")
+    end = len(text) if newline_index == -1 else newline_index + 3
+    index = text.rfind("]", 3, end)
+    while index != -1:
+        if not text[index - 2].isspace() and text[index - 1] != "]":
+            return text[1:index]
+        index = text.rfind("]", 3, index)
+    return None
+
+
+async def ensure_thread_name(
+    thread: discord.Thread,
+    name_template,
+    starting_messages: StartingMessagesCache | None = None,
+) -> str | None:
     """Ensures given thread has a name"""
-    starting_message = await fetch_starting_message(thread)
+    starting_message = await fetch_starting_message(thread, starting_messages)
     if starting_message:
         name = name_thread(starting_message, name_template)
         if thread.name != name:
@@ -77,8 +154,59 @@ async def ensure_thread_name(thread: discord.Thread, name_template) -> str | Non
         return None
 
 
+class ThreadMembersCache:
+    """
+    Keeps IDs of thread members in memory, so they don't need to be fetched
+
+    Each thread gets fetched once and then the cache is kept up to date by
+    the gateway events about thread members joining and leaving. If Discord
+    reports a member count which doesn't fit the cache, the thread gets
+    fetched again.
+    """
+
+    def __init__(self):
+        self._members: dict[int, set[int]] = {}
+        self._member_counts: dict[int, int | None] = {}
+
+    def __contains__(self, thread_id: int) -> bool:
+        return thread_id in self._members
+
+    async def get(self, thread: discord.Thread) -> set[int]:
+        members_ids = self._members.get(thread.id)
+        if members_ids is None or not self.is_consistent(thread, members_ids):
+            thread_members = await thread.fetch_members()
+            members_ids = {member.id for member in thread_members}
+            self._members[thread.id] = members_ids
+            self._member_counts[thread.id] = thread.member_count
+        return members_ids
+
+    def is_consistent(self, thread: discord.Thread, members_ids: set[int]) -> bool:
+        # The member count reported by Discord is approximate and isn't updated
+        # on every join, so it's only a reason for a refetch if it has changed
+        # since the last fetch and it doesn't match the cache
+        member_count = thread.member_count
+        if member_count is None or member_count == self._member_counts[thread.id]:
+            return True
+        return member_count == min(len(members_ids), THREAD_MEMBER_COUNT_CAP)
+
+    def add(self, thread_id: int, member_id: int) -> None:
+        if (members_ids := self._members.get(thread_id)) is not None:
+            members_ids.add(member_id)
+
+    def remove(self, thread_id: int, member_id: int) -> None:
+        if (members_ids := self._members.get(thread_id)) is not None:
+            members_ids.discard(member_id)
+
+    def forget(self, thread_id: int) -> None:
+        self._members.pop(thread_id, None)
+        self._member_counts.pop(thread_id, None)
+
+
 async def get_missing_members(
-    thread: discord.Thread, role_id: int
+    thread: discord.Thread,
+    role_id: int,
+    thread_members: ThreadMembersCache | None = None,
+    role_members: RoleMembersIndex | None = None,
 ) -> list[discord.Member]:
     """Returns role members who are not in the thread"""
     if not thread.parent:
@@ -89,28 +217,124 @@ async def get_missing_members(
     if not role:
         raise ValueError(f"Role #{role_id} not found in guild {guild.name!r}")
 
-    thread_members = await thread.fetch_members()
-    thread_members_ids = {member.id for member in thread_members}
-    return [member for member in role.members if member.id not in thread_members_ids]
+    if thread_members is None:
+        thread_members_ids = {member.id for member in await thread.fetch_members()}
+    else:
+        thread_members_ids = await thread_members.get(thread)
+    members = role_members.get_members(guild, role) if role_members else role.members
+    return [member for member in members if member.id not in thread_members_ids]
+
+
+class BotMessages:
+    """
+    Remembers IDs of messages sent by the bot, per thread and purpose
+
+    Thanks to this, the messages can be deleted without scanning the history
+    of the thread and without touching anything else than what was recorded.
+    """
+
+    def __init__(self, maxsize: int = 1000, limit_count: int = 10):
+        self.limit_count = limit_count
+        self._messages_ids: LRUCache[tuple[int, str], list[int]] = LRUCache(maxsize)
+
+    def record(self, thread_id: int, purpose: str, message_id: int) -> None:
+        messages_ids = self._messages_ids.get((thread_id, purpose)) or []
+        messages_ids.append(message_id)
+        self._messages_ids.set((thread_id, purpose), messages_ids[-self.limit_count :])
 
+    def pop(self, thread_id: int, purpose: str) -> list[int]:
+        return self._messages_ids.pop((thread_id, purpose)) or []
 
-async def clear_recent_bot_messages(
+
+async def clear_bot_messages(
     thread: discord.Thread,
-    limit_count: int = 10,
-    limit_days: int = 60,
+    bot_messages: BotMessages,
+    purpose: str,
     now: datetime | None = None,
 ) -> None:
-    """Clears messages sent by the bot in given thread"""
-    after = (now or datetime.now(UTC)) - timedelta(days=limit_days)
-    await thread.purge(
-        limit=limit_count,
-        after=after,
-        check=lambda m: m.author == thread.guild.me and not m.is_system(),
-        reason="Clearing recent bot messages",
-    )
+    """Deletes messages the bot has recorded for given thread and purpose"""
+    messages_ids = bot_messages.pop(thread.id, purpose)
+    bulk_after = (now or datetime.now(UTC)) - BULK_DELETE_MAX_AGE
+    recent_messages = [
+        discord.Object(message_id)
+        for message_id in messages_ids
+        if discord.utils.snowflake_time(message_id) > bulk_after
+    ]
+    old_messages = [
+        thread.get_partial_message(message_id)
+        for message_id in messages_ids
+        if discord.utils.snowflake_time(message_id) <= bulk_after
+    ]
+    for i in range(0, len(recent_messages), BULK_DELETE_MAX_COUNT):
+        try:
+            await thread.delete_messages(
+                recent_messages[i : i + BULK_DELETE_MAX_COUNT],
+                reason="Clearing recent bot messages",
+            )
+        except discord.NotFound:
+            logger.info(f"Bot message in {thread.name!r} is already deleted")
+    for message in old_messages:
+        try:
+            await message.delete(reason="Clearing old bot messages")
+        except discord.NotFound:
+            logger.info(f"Bot message #{message.id} is already deleted")
+
 
+class RolePings:
+    """
+    Coalesces pings of the same role in the same thread
 
-async def ping_members_with_role(thread: discord.Thread, role_id: int) -> None:
+    A ping costs two REST calls, sending the message and deleting it. Pinging
+    the same role in the same thread again within a short window is useless,
+    as the members have been added to the thread already, so such pings are
+    skipped. Deleting the ping messages happens in the background.
+    """
+
+    def __init__(self, window: timedelta = ROLE_PING_WINDOW):
+        self.window = window
+        self.saved_calls = 0
+        self._pinged_at: dict[tuple[int, int], float] = {}
+        self._deletions: set[asyncio.Task] = set()
+
+    async def ping(self, thread: discord.Thread, role_id: int) -> None:
+        now = time.monotonic()
+        window_sec = self.window.total_seconds()
+        self._pinged_at = {
+            key: pinged_at
+            for key, pinged_at in self._pinged_at.items()
+            if now - pinged_at < window_sec
+        }
+        key = (thread.id, role_id)
+        if key in self._pinged_at:
+            self.saved_calls += 2
+            logger.info(
+                f"Role #{role_id} already pinged in {thread.name!r}, skipping "
+                f"(saved {self.saved_calls} REST calls so far)"
+            )
+            return
+        self._pinged_at[key] = now
+        try:
+            message = await thread.send(f"<@&{role_id}>", silent=True)
+        except Exception:
+            del self._pinged_at[key]
+            raise
+        task = asyncio.create_task(self._delete(message))
+        self._deletions.add(task)
+        task.add_done_callback(self._deletions.discard)
+
+    async def _delete(self, message: discord.Message) -> None:
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            logger.exception(f"Failed to delete role ping #{message.id}")
+
+
+async def ping_members_with_role(
+    thread: discord.Thread, role_id: int, role_pings: RolePings | None = None
+) -> None:
     """Adds and pings members of given role to given thread"""
+    if role_pings:
+        await role_pings.ping(thread, role_id)
+        return
     message = await thread.send(f"<@&{role_id}>", silent=True)
     await message.delete()
@@ -1,18 +1,21 @@
 import asyncio
 import logging
 import subprocess
+from pathlib import Path
 
 import click
 from aiohttp.web import AppRunner, TCPSite
 
-from jg.chick.bot import bot
+from jg.chick.bot import ChickBot, create_bot, save_interests_snapshot
+from jg.chick.lib.log import setup_logging
+from jg.chick.lib.reviews import REVIEW_WORKERS
 from jg.chick.web import web
 
 
 logger = logging.getLogger("jg.chick")
 
 
-async def run(host, port, discord_api_key) -> None:
+async def run(bot: ChickBot, host, port, discord_api_key) -> None:
     # inspired by https://stackoverflow.com/a/54462411/325365
     logger.info(f"Starting the web app at {host}:{port}")
     runner = AppRunner(web)
@@ -27,6 +30,8 @@ async def run(host, port, discord_api_key) -> None:
         await bot.close()
         raise
     finally:
+        await bot.reviews.stop()
+        await bot.close_http_session()
         await runner.cleanup()
 
 
@@ -65,23 +70,70 @@ async def run(host, port, discord_api_key) -> None:
     envvar="DISCORD_API_KEY",
     help="Discord API key.",
 )
+@click.option(
+    "--snapshot-path",
+    envvar="SNAPSHOT_PATH",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    help="File to keep interest notification state in across restarts.",
+)
+@click.option(
+    "--review-workers",
+    envvar="REVIEW_WORKERS",
+    default=REVIEW_WORKERS,
+    type=click.IntRange(min=1),
+    help="How many reviews can run at the same time.",
+)
+@click.option(
+    "--member-cache/--no-member-cache",
+    envvar="MEMBER_CACHE",
+    default=True,
+    help="Keep guild members in memory.",
+)
+@click.option(
+    "--chunk-guilds/--no-chunk-guilds",
+    envvar="CHUNK_GUILDS",
+    default=True,
+    help="Download all guild members at startup.",
+)
+@click.option(
+    "--max-messages",
+    envvar="MAX_MESSAGES",
+    default=1000,
+    type=click.IntRange(min=0),
+    help="How many messages to keep in memory, 0 to keep none.",
+)
 def main(
-    debug: bool, production: bool, host: str, port: int, discord_api_key: str
+    debug: bool,
+    production: bool,
+    host: str,
+    port: int,
+    discord_api_key: str,
+    snapshot_path: Path | None,
+    review_workers: int,
+    member_cache: bool,
+    chunk_guilds: bool,
+    max_messages: int,
 ) -> None:
-    logging.basicConfig()
+    log_listener = setup_logging()
     logging.getLogger("jg").setLevel(logging.DEBUG if debug else logging.INFO)
 
     logger.info("Starting")
+    bot = create_bot(member_cache, chunk_guilds, max_messages)
+    bot.snapshot_path = snapshot_path
+    bot.reviews.workers = review_workers
     if production:
         logger.warning("Stopping production enviornment")
         subprocess.run(["flyctl", "machine", "stop"])
 
     loop = asyncio.get_event_loop()
     try:
-        loop.run_until_complete(run(host, port, discord_api_key))
+        loop.run_until_complete(run(bot, host, port, discord_api_key))
     except KeyboardInterrupt:
         logger.info("Terminating")
     finally:
+        # SIGINT interrupts the loop, so the cleanup in run() doesn't get to run
+        save_interests_snapshot()
         if production:
             logger.warning("Starting production enviornment")
             subprocess.run(["flyctl", "machine", "start"])
+        log_listener.stop()
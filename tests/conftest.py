@@ -0,0 +1,38 @@
+from typing import Any, Callable
+
+import pytest
+from aiohttp import web
+
+
+JSONAPIFactory = Callable[..., tuple[web.Application, list[dict]]]
+
+
+@pytest.fixture
+def create_json_api() -> JSONAPIFactory:
+    """
+    Returns a factory for an app serving given payload at given path
+
+    Each request gets the next status from the list. The app records headers
+    of the requests it gets.
+    """
+
+    def factory(
+        path: str,
+        payload: Any,
+        statuses: list[int],
+        headers: dict[str, str] | None = None,
+    ) -> tuple[web.Application, list[dict]]:
+        requests = []
+
+        async def handler(request: web.Request) -> web.Response:
+            requests.append(dict(request.headers))
+            status = statuses.pop(0)
+            if status == 200:
+                return web.json_response(payload, headers=headers)
+            return web.Response(status=status)
+
+        app = web.Application()
+        app.router.add_get(path, handler)
+        return app, requests
+
+    return factory
@@ -0,0 +1,244 @@
+import contextlib
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
+import discord
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestServer
+from jg.hen.models import Summary
+
+from jg.chick import bot as bot_module
+from jg.chick.bot import ChickBot, create_bot, handle_review_mention, review_github
+from jg.chick.lib import reviews
+from jg.chick.lib.profiles import ProfilesIndex
+from jg.chick.lib.reviews import (
+    REVIEW_TAGS_NAMES,
+    CachedSummary,
+    GitHubRateBudget,
+    ReviewQueue,
+    SummariesCache,
+)
+
+
+class FakeUser:
+    id = 1
+    mention = "<@1>"
+
+
+class FakeSummary:
+    def __init__(self):
+        self.username = "honzajavorek"
+        self.error = None
+        self.outcomes = []
+
+
+class FakeTag:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FakeForumChannel:
+    def __init__(self):
+        self.id = 10
+        self.name = "cv-github-linkedin"
+        self.available_tags = [FakeTag(name) for name in REVIEW_TAGS_NAMES]
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.attachments = []
+        self.replies = []
+
+    async def reply(self, content: str, **kwargs):
+        self.replies.append(content)
+
+    async def add_reaction(self, emoji: str):
+        pass
+
+
+class FakeThread:
+    def __init__(self, starting_message: FakeMessage):
+        self.id = 20
+        self.name = "Mrknete na můj GitHub"
+        self.parent = FakeForumChannel()
+        self.applied_tags = []
+        self.starting_message = starting_message
+        self.sent = []
+
+    @contextlib.asynccontextmanager
+    async def typing(self):
+        yield
+
+    async def send(self, **kwargs):
+        self.sent.append(kwargs)
+
+    async def edit(self, **kwargs):
+        pass
+
+
+@pytest_asyncio.fixture
+async def bot(monkeypatch: pytest.MonkeyPatch) -> ChickBot:
+    bot = create_bot()
+    monkeypatch.setattr(ChickBot, "user", FakeUser())
+    monkeypatch.setattr(bot, "reviews", ReviewQueue(workers=1))
+    monkeypatch.setattr(bot, "summaries", SummariesCache())
+    github_budget = GitHubRateBudget()
+    github_budget.record(
+        5000, int((datetime.now(UTC) + timedelta(hours=1)).timestamp())
+    )
+    monkeypatch.setattr(bot, "github_budget", github_budget)
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_mention_reuses_review_of_unchanged_profile(
+    bot: ChickBot, monkeypatch: pytest.MonkeyPatch, create_json_api
+):
+    checked_urls = []
+
+    async def check_profile_url(url: str, github_api_key: str | None = None):
+        checked_urls.append(url)
+        return cast(Summary, FakeSummary())
+
+    async def fetch_profile_version(username: str, session=None) -> str:
+        return "2024-01-01/2024-02-02"
+
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", fetch_profile_version)
+    app, _ = create_json_api("/profiles.json", {"items": []}, [200])
+    starting_message = FakeMessage("Mrknete na https://github.com/honzajavorek")
+    thread = FakeThread(starting_message)
+
+    async with TestServer(app) as server:
+        monkeypatch.setattr(
+            bot, "profiles", ProfilesIndex(str(server.make_url("/profiles.json")))
+        )
+        bot.reviews.start()
+        try:
+            for _ in range(2):
+                await handle_review_mention(
+                    cast(discord.Thread, thread),
+                    cast(discord.Message, FakeMessage("<@1> mrkni na to")),
+                )
+                await bot.reviews.join()
+        finally:
+            await bot.reviews.stop()
+            await bot.close_http_session()
+
+    assert checked_urls == ["https://github.com/honzajavorek/"]
+    assert len(starting_message.replies) == 2
+    assert thread.sent.count(thread.sent[0]) == 2
+
+
+@pytest.mark.asyncio
+async def test_review_github_survives_failing_reply_and_profiles_refresh(
+    bot: ChickBot, monkeypatch: pytest.MonkeyPatch
+):
+    async def check_profile_url(url: str, github_api_key: str | None = None):
+        return cast(Summary, FakeSummary())
+
+    async def fetch_profile_version(username: str, session=None) -> str:
+        return "2024-01-01/2024-02-02"
+
+    async def refresh_stale_profiles():
+        raise RuntimeError("Profiles are down")
+
+    async def reply(content: str, **kwargs):
+        raise RuntimeError("Discord is down")
+
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", fetch_profile_version)
+    monkeypatch.setattr(bot_module, "refresh_stale_profiles", refresh_stale_profiles)
+    starting_message = FakeMessage("Mrknete na https://github.com/honzajavorek")
+    monkeypatch.setattr(starting_message, "reply", reply)
+    thread = FakeThread(starting_message)
+    try:
+        await review_github(
+            cast(discord.Message, starting_message),
+            cast(discord.Thread, thread),
+            "https://github.com/honzajavorek/",
+        )
+    finally:
+        await bot.close_http_session()
+
+    assert thread.sent
+
+
+@pytest.mark.asyncio
+async def test_review_github_reuses_review_of_unchanged_profile_on_low_budget(
+    bot: ChickBot, monkeypatch: pytest.MonkeyPatch
+):
+    async def check_profile_url(url: str, github_api_key: str | None = None):
+        raise AssertionError("Profile shouldn't be checked")
+
+    async def fetch_profile_version(username: str, session=None) -> str:
+        return "2024-01-01/2024-02-02"
+
+    async def refresh_stale_profiles():
+        pass
+
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", fetch_profile_version)
+    monkeypatch.setattr(bot_module, "refresh_stale_profiles", refresh_stale_profiles)
+    bot.github_budget.record(
+        10, int((datetime.now(UTC) + timedelta(hours=1)).timestamp())
+    )
+    bot.summaries.set(
+        "honzajavorek",
+        CachedSummary(cast(Summary, FakeSummary()), "2024-01-01/2024-02-02"),
+    )
+    starting_message = FakeMessage("Mrknete na https://github.com/honzajavorek")
+    thread = FakeThread(starting_message)
+    try:
+        await review_github(
+            cast(discord.Message, starting_message),
+            cast(discord.Thread, thread),
+            "https://github.com/honzajavorek/",
+        )
+    finally:
+        await bot.close_http_session()
+
+    assert thread.sent
+    assert len(starting_message.replies) == 1
+    assert "⏳" not in starting_message.replies[0]
+
+
+@pytest.mark.asyncio
+async def test_review_github_defers_review_of_changed_profile_on_low_budget(
+    bot: ChickBot, monkeypatch: pytest.MonkeyPatch
+):
+    async def check_profile_url(url: str, github_api_key: str | None = None):
+        raise AssertionError("Profile shouldn't be checked")
+
+    async def fetch_profile_version(username: str, session=None) -> str:
+        return "2024-03-03/2024-03-03"
+
+    async def refresh_stale_profiles():
+        pass
+
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", fetch_profile_version)
+    monkeypatch.setattr(bot_module, "refresh_stale_profiles", refresh_stale_profiles)
+    bot.github_budget.record(
+        10, int((datetime.now(UTC) + timedelta(hours=1)).timestamp())
+    )
+    bot.summaries.set(
+        "honzajavorek",
+        CachedSummary(cast(Summary, FakeSummary()), "2024-01-01/2024-02-02"),
+    )
+    starting_message = FakeMessage("Mrknete na https://github.com/honzajavorek")
+    thread = FakeThread(starting_message)
+    try:
+        await review_github(
+            cast(discord.Message, starting_message),
+            cast(discord.Thread, thread),
+            "https://github.com/honzajavorek/",
+        )
+    finally:
+        await bot.reviews.stop()
+        await bot.close_http_session()
+
+    assert not thread.sent
+    assert starting_message.replies[-1].startswith("⏳")
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from jg.chick.lib.cache import LRUCache
+
+
+def test_lru_cache_drops_least_recently_used():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_lru_cache_counts_hits_and_misses():
+    cache: LRUCache[str, int] = LRUCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lru_cache_expires_items():
+    cache: LRUCache[str, int] = LRUCache(ttl=timedelta(0))
+    cache.set("a", 1)
+
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert cache.misses == 1
+
+
+def test_lru_cache_keeps_fresh_items():
+    cache: LRUCache[str, int] = LRUCache(ttl=timedelta(hours=1))
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
@@ -1,23 +1,60 @@
+import asyncio
 from datetime import UTC, datetime, timedelta
+from pathlib import Path
 
-from jg.chick.lib.interests import NOTIFICATION_COOLDOWN, Interest, parse, should_notify
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
+from jg.chick.lib import http
+from jg.chick.lib.interests import (
+    NOTIFICATION_COOLDOWN,
+    Debouncer,
+    Interest,
+    Interests,
+    InterestsDiff,
+    InterestsFetcher,
+    apply,
+    claim_notification,
+    diff,
+    load_snapshot,
+    save_snapshot,
+    should_notify,
+)
 
-def test_parse_initializes_from_empty_state():
+
+API_PAYLOAD = [{"thread_id": 1, "role_id": 100}]
+
+
+@pytest.fixture
+def create_api(create_json_api):
+    def factory(statuses: list[int]) -> tuple[web.Application, list[dict]]:
+        return create_json_api(
+            "/interests.json",
+            API_PAYLOAD,
+            statuses,
+            headers={"ETag": '"v1"', "Last-Modified": "Wed"},
+        )
+
+    return factory
+
+
+def test_apply_diff_initializes_from_empty_state():
     current_interests: dict[int, Interest] = {}
     api_payload = [
         {"thread_id": 1, "role_id": 100},
         {"thread_id": 2, "role_id": 200},
     ]
-    parsed = parse(api_payload, current_interests)
+    apply(current_interests, diff(current_interests, api_payload))
 
-    assert parsed == {
+    assert current_interests == {
         1: {"role_id": 100, "last_notified_at": None},
         2: {"role_id": 200, "last_notified_at": None},
     }
 
 
-def test_parse_preserves_last_notified_for_existing_thread():
+def test_apply_diff_preserves_last_notified_for_existing_thread():
     last_notified = datetime.now(UTC) - timedelta(hours=2)
     current_interests: dict[int, Interest] = {
         3: {"role_id": 100, "last_notified_at": last_notified},
@@ -26,15 +63,15 @@ def test_parse_preserves_last_notified_for_existing_thread():
         {"thread_id": 3, "role_id": 100},
         {"thread_id": 4, "role_id": 300},
     ]
-    parsed = parse(api_payload, current_interests)
+    apply(current_interests, diff(current_interests, api_payload))
 
-    assert parsed == {
+    assert current_interests == {
         3: {"role_id": 100, "last_notified_at": last_notified},
         4: {"role_id": 300, "last_notified_at": None},
     }
 
 
-def test_parse_resets_last_notified_for_new_thread_with_existing_role():
+def test_apply_diff_resets_last_notified_for_new_thread_with_existing_role():
     last_notified = datetime.now(UTC) - timedelta(hours=1)
     current_interests: dict[int, Interest] = {
         1: {"role_id": 100, "last_notified_at": last_notified},
@@ -42,23 +79,23 @@ def test_parse_resets_last_notified_for_new_thread_with_existing_role():
     api_payload = [
         {"thread_id": 2, "role_id": 100},
     ]
-    parsed = parse(api_payload, current_interests)
+    apply(current_interests, diff(current_interests, api_payload))
 
-    assert parsed == {
+    assert current_interests == {
         2: {"role_id": 100, "last_notified_at": None},
     }
 
 
-def test_parse_drops_threads_missing_from_payload():
+def test_apply_diff_drops_threads_missing_from_payload():
     current_interests: dict[int, Interest] = {
         1: {"role_id": 100, "last_notified_at": datetime.now(UTC)},
     }
     api_payload = [
         {"thread_id": 2, "role_id": 200},
     ]
-    parsed = parse(api_payload, current_interests)
+    apply(current_interests, diff(current_interests, api_payload))
 
-    assert list(parsed.keys()) == [2]
+    assert list(current_interests.keys()) == [2]
 
 
 def test_should_notify_when_never_notified():
@@ -97,3 +134,280 @@ def test_custom_cooldown_respected():
     }
 
     assert should_notify(interest, now, cooldown=cooldown) is False
+
+
+@pytest.mark.asyncio
+async def test_fetcher_skips_unchanged_payload(create_api):
+    app, requests = create_api([200, 304])
+    async with TestServer(app) as server:
+        fetcher = InterestsFetcher(
+            str(server.make_url("/interests.json")), min_interval=timedelta(0)
+        )
+
+        assert await fetcher.fetch() == API_PAYLOAD
+        assert await fetcher.fetch() is None
+        assert fetcher.payload == API_PAYLOAD
+        assert requests[1]["If-None-Match"] == '"v1"'
+        assert requests[1]["If-Modified-Since"] == "Wed"
+
+
+@pytest.mark.asyncio
+async def test_fetcher_uses_given_session(create_api):
+    app, requests = create_api([200, 304])
+    async with TestServer(app) as server, http.create_session() as session:
+        fetcher = InterestsFetcher(
+            str(server.make_url("/interests.json")), min_interval=timedelta(0)
+        )
+
+        assert await fetcher.fetch(session) == API_PAYLOAD
+        assert await fetcher.fetch(session) is None
+        assert not session.closed
+
+
+@pytest.mark.asyncio
+async def test_fetcher_skips_fetching_within_min_interval(create_api):
+    app, requests = create_api([200, 200])
+    async with TestServer(app) as server:
+        fetcher = InterestsFetcher(str(server.make_url("/interests.json")))
+        await fetcher.fetch()
+
+        assert await fetcher.fetch() is None
+        assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetcher_retries(create_api):
+    app, requests = create_api([500, 503, 200])
+    async with TestServer(app) as server:
+        fetcher = InterestsFetcher(
+            str(server.make_url("/interests.json")), backoff=timedelta(0)
+        )
+
+        assert await fetcher.fetch() == API_PAYLOAD
+        assert len(requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_fetcher_keeps_stale_payload_on_failure(create_api):
+    app, requests = create_api([200, 500, 500])
+    async with TestServer(app) as server:
+        fetcher = InterestsFetcher(
+            str(server.make_url("/interests.json")),
+            min_interval=timedelta(0),
+            retries=1,
+            backoff=timedelta(0),
+        )
+        await fetcher.fetch()
+
+        assert await fetcher.fetch() is None
+        assert fetcher.payload == API_PAYLOAD
+
+
+@pytest.mark.asyncio
+async def test_fetcher_raises_without_stale_payload(create_api):
+    app, requests = create_api([500, 500])
+    async with TestServer(app) as server:
+        fetcher = InterestsFetcher(
+            str(server.make_url("/interests.json")),
+            retries=1,
+            backoff=timedelta(0),
+        )
+
+        with pytest.raises(aiohttp.ClientResponseError):
+            await fetcher.fetch()
+
+
+@pytest.mark.asyncio
+async def test_claim_notification_concurrently_notifies_once():
+    now = datetime.now(UTC)
+    interests: Interests = {1: {"role_id": 100, "last_notified_at": None}}
+    notifications = []
+
+    async def handle_message():
+        async with claim_notification(interests, 1, now) as interest:
+            if interest:
+                await asyncio.sleep(0.01)  # e.g. fetching members over REST
+                notifications.append(interest["role_id"])
+
+    await asyncio.gather(*[handle_message() for _ in range(10)])
+
+    assert notifications == [100]
+
+
+@pytest.mark.asyncio
+async def test_claim_notification_survives_refresh():
+    now = datetime.now(UTC)
+    interests: Interests = {1: {"role_id": 100, "last_notified_at": None}}
+    async with claim_notification(interests, 1, now) as interest:
+        assert interest
+        api_payload = [
+            {"thread_id": 1, "role_id": 100},
+            {"thread_id": 2, "role_id": 200},
+        ]
+        apply(interests, diff(interests, api_payload))
+
+    async with claim_notification(interests, 1, now) as interest:
+        assert interest is None
+
+
+@pytest.mark.asyncio
+async def test_claim_notification_restores_state_on_failure():
+    now = datetime.now(UTC)
+    interests: Interests = {1: {"role_id": 100, "last_notified_at": None}}
+    with pytest.raises(RuntimeError):
+        async with claim_notification(interests, 1, now):
+            raise RuntimeError("Discord is down")
+
+    assert interests[1]["last_notified_at"] is None
+
+
+@pytest.mark.asyncio
+async def test_claim_notification_ignores_other_threads():
+    now = datetime.now(UTC)
+    interests: Interests = {1: {"role_id": 100, "last_notified_at": None}}
+    async with claim_notification(interests, 2, now) as interest:
+        assert interest is None
+
+
+@pytest.mark.asyncio
+async def test_claim_notification_does_not_block_other_threads():
+    now = datetime.now(UTC)
+    interests: Interests = {
+        1: {"role_id": 100, "last_notified_at": None},
+        2: {"role_id": 200, "last_notified_at": None},
+    }
+    slow_notification_done = asyncio.Event()
+
+    async def notify_slowly():
+        async with claim_notification(interests, 1, now):
+            await slow_notification_done.wait()
+
+    task = asyncio.create_task(notify_slowly())
+    await asyncio.sleep(0)
+    async with asyncio.timeout(1):
+        async with claim_notification(interests, 2, now) as interest:
+            assert interest
+    slow_notification_done.set()
+    await task
+
+
+def test_snapshot_roundtrip(tmp_path: Path):
+    path = tmp_path / "snapshot.json"
+    interests: Interests = {
+        1: {"role_id": 100, "last_notified_at": datetime.now(UTC)},
+        2: {"role_id": 200, "last_notified_at": None},
+    }
+    save_snapshot(interests, path)
+
+    assert load_snapshot(path) == interests
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_snapshot_restores_cooldown_after_restart(tmp_path: Path):
+    path = tmp_path / "snapshot.json"
+    last_notified = datetime.now(UTC) - timedelta(hours=1)
+    save_snapshot({1: {"role_id": 100, "last_notified_at": last_notified}}, path)
+    interests = load_snapshot(path)
+    apply(interests, diff(interests, [{"thread_id": 1, "role_id": 100}]))
+
+    assert should_notify(interests[1], datetime.now(UTC)) is False
+
+
+def test_load_snapshot_missing(tmp_path: Path):
+    assert load_snapshot(tmp_path / "snapshot.json") == {}
+
+
+def test_load_snapshot_invalid(tmp_path: Path):
+    path = tmp_path / "snapshot.json"
+    path.write_text('{"1": ')
+
+    assert load_snapshot(path) == {}
+
+
+def test_diff():
+    current_interests: Interests = {
+        1: {"role_id": 100, "last_notified_at": None},
+        2: {"role_id": 200, "last_notified_at": None},
+        3: {"role_id": 300, "last_notified_at": None},
+    }
+    api_payload = [
+        {"thread_id": 1, "role_id": 100},
+        {"thread_id": 3, "role_id": 301},
+        {"thread_id": 4, "role_id": 400},
+    ]
+
+    assert diff(current_interests, api_payload) == InterestsDiff(
+        added={4: 400}, removed=[2], changed={3: 301}
+    )
+
+
+def test_diff_no_changes():
+    current_interests: Interests = {1: {"role_id": 100, "last_notified_at": None}}
+
+    assert not diff(current_interests, [{"thread_id": 1, "role_id": 100}])
+
+
+def test_apply():
+    last_notified = datetime.now(UTC) - timedelta(hours=2)
+    current_interests: Interests = {
+        1: {"role_id": 100, "last_notified_at": last_notified},
+        2: {"role_id": 200, "last_notified_at": None},
+        3: {"role_id": 300, "last_notified_at": last_notified},
+    }
+    unchanged_interest = current_interests[1]
+    apply(
+        current_interests,
+        InterestsDiff(added={4: 400}, removed=[2], changed={3: 301}),
+    )
+
+    assert current_interests == {
+        1: {"role_id": 100, "last_notified_at": last_notified},
+        3: {"role_id": 301, "last_notified_at": last_notified},
+        4: {"role_id": 400, "last_notified_at": None},
+    }
+    assert current_interests[1] is unchanged_interest
+
+
+@pytest.mark.asyncio
+async def test_debouncer_runs_burst_once():
+    debouncer = Debouncer(delay=timedelta(seconds=0.01))
+    runs = []
+
+    async def job():
+        runs.append(1)
+
+    scheduled = [debouncer.schedule(1, job) for _ in range(10)]
+    await asyncio.sleep(0.05)
+
+    assert scheduled == [True] + [False] * 9
+    assert runs == [1]
+    assert 1 not in debouncer
+
+
+@pytest.mark.asyncio
+async def test_debouncer_keeps_threads_apart():
+    debouncer = Debouncer(delay=timedelta(0))
+    runs = []
+
+    async def job():
+        runs.append(1)
+
+    debouncer.schedule(1, job)
+    debouncer.schedule(2, job)
+    await asyncio.sleep(0.01)
+
+    assert runs == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_debouncer_survives_failing_job():
+    debouncer = Debouncer(delay=timedelta(0))
+
+    async def job():
+        raise RuntimeError("Discord is down")
+
+    debouncer.schedule(1, job)
+    await asyncio.sleep(0.01)
+
+    assert debouncer.schedule(1, job) is True
+    await asyncio.sleep(0.01)
@@ -1,6 +1,30 @@
+import re
+
 import pytest
 
-from jg.chick.lib.intro import choose_intro_emojis, generate_intro_message
+from jg.chick.lib.intro import (
+    PATTERNS_EMOJIS_MAPPING,
+    choose_intro_emojis,
+    generate_intro_message,
+    get_pattern_keyword,
+)
+
+
+INTRO_MESSAGES_CONTENTS = [
+    """
+        Mám takový obecný přehled o programování HTML, CSS,
+        Bootstrap, Python, Matlab 🫣, SQL, okrajově JS.
+    """,
+    "základní struktury v pythonu a C# v ITnetwork",
+    "Láká mě C++ a C#",
+    "Dělám v EXCELU, zkouším Power BI a PowerBI, databáze mě baví",
+    "Frontend, front-end, Next.js, nextjs, React a Vue, trochu i .NET a Javu",
+    "Pracuji s Kubernetes, Dockerem a Linuxem, občas PostgreSQL a MySQL",
+    "Ahoj, jsem Jana a programování mě teprve čeká",
+    "Micropython a SQLite nepočítám, ale Python a SQL ano",
+    "Straße, ǅungla a JavaScript",
+    "",
+]
 
 
 def test_choose_intro_emojis():
@@ -26,6 +50,41 @@ def test_choose_intro_emoji_edge_cases(user_message_content: str, expected_emoji
     assert expected_emoji in choose_intro_emojis(user_message_content)
 
 
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (r"\bpython\w*\b", "python"),
+        (r"\bfront\-?end\w*\b", "front"),
+        (r"\bpower ?bi\b", "power"),
+        (r"\bnext\.?js\b", "next"),
+        (r"\bC\+\+\W", "C++"),
+        (r"\b(java|javy|javě|javu|javou)\b", ""),
+    ],
+)
+def test_get_pattern_keyword(pattern: str, expected: str):
+    assert get_pattern_keyword(re.compile(pattern)) == expected
+
+
+def test_get_pattern_keyword_ignore_case():
+    assert get_pattern_keyword(re.compile(r"\b\.NET\b", re.I)) == ".net"
+
+
+@pytest.mark.parametrize("user_message_content", INTRO_MESSAGES_CONTENTS)
+def test_choose_intro_emojis_same_as_searching_every_pattern(
+    user_message_content: str,
+):
+    expected_emojis = set()
+    for pattern_re, pattern_emojis in PATTERNS_EMOJIS_MAPPING.items():
+        if pattern_re.search(user_message_content):
+            expected_emojis.update(pattern_emojis)
+
+    assert set(choose_intro_emojis(user_message_content)) == expected_emojis | {
+        "👋",
+        "🐣",
+        "👍",
+    }
+
+
 @pytest.mark.asyncio  # unfortunately ui.View() touches the event loop
 async def test_generate_intro_message():
     user_message_content = """
@@ -63,3 +122,13 @@ async def test_generate_intro_message_with_gh_connection_suggestion():
     assert tips_snippet in bot_message_content
     assert footer_snippet in bot_message_content
     assert bot_message_content in bot_message_content
+
+
+@pytest.mark.asyncio  # unfortunately ui.View() touches the event loop
+async def test_generate_intro_message_is_prepared_only_once():
+    message = generate_intro_message("Ahoj, programuju v Pythonu")
+    gh_message = generate_intro_message("Ahoj, https://github.com/superghuser")
+
+    assert generate_intro_message("Ahoj, zkouším SQL") is message
+    assert generate_intro_message("https://github.com/honzajavorek") is gh_message
+    assert message["view"] is gh_message["view"]
@@ -0,0 +1,96 @@
+import io
+import logging
+from datetime import timedelta
+
+import pytest
+
+from jg.chick.lib.log import (
+    LazyQueueHandler,
+    RateLimitFilter,
+    StructuredFormatter,
+    setup_logging,
+)
+
+
+def create_record(
+    msg: str = "Processing message %s",
+    args: tuple = ("#1",),
+    level: int = logging.INFO,
+    **extra,
+) -> logging.LogRecord:
+    record = logging.LogRecord("jg.chick.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_lazy_queue_handler_doesnt_format():
+    record = create_record()
+    prepared = LazyQueueHandler(None).prepare(record)  # type: ignore
+
+    assert prepared.msg == "Processing message %s"
+    assert prepared.args == ("#1",)
+
+
+def test_rate_limit_filter_lets_burst_through():
+    rate_limit = RateLimitFilter(burst=3, interval=timedelta(hours=1))
+    results = [rate_limit.filter(create_record(args=(i,))) for i in range(5)]
+
+    assert results == [True, True, True, False, False]
+
+
+def test_rate_limit_filter_tells_messages_apart():
+    rate_limit = RateLimitFilter(burst=1, interval=timedelta(hours=1))
+
+    assert rate_limit.filter(create_record("Processing DM message", ()))
+    assert rate_limit.filter(create_record("Processing thread message", ()))
+
+
+def test_rate_limit_filter_lets_warnings_through():
+    rate_limit = RateLimitFilter(burst=1, interval=timedelta(hours=1))
+    rate_limit.filter(create_record(level=logging.WARNING))
+
+    assert rate_limit.filter(create_record(level=logging.WARNING))
+
+
+def test_rate_limit_filter_counts_suppressed():
+    rate_limit = RateLimitFilter(burst=1, interval=timedelta(0))
+    rate_limit._windows[("jg.chick.test", "Processing message %s")] = (0, 1, 5)
+    record = create_record()
+
+    assert rate_limit.filter(record)
+    assert getattr(record, "suppressed") == 5
+
+
+@pytest.mark.parametrize(
+    "extra, expected",
+    [
+        ({}, "INFO:jg.chick.test:Processing message #1"),
+        (
+            {"event": "message", "channel_id": 123, "duration": "0.002s"},
+            "INFO:jg.chick.test:Processing message #1 "
+            "[event=message channel_id=123 duration=0.002s]",
+        ),
+    ],
+)
+def test_structured_formatter(extra: dict, expected: str):
+    formatter = StructuredFormatter(logging.BASIC_FORMAT)
+
+    assert formatter.format(create_record(**extra)) == expected
+
+
+def test_setup_logging():
+    stream = io.StringIO()
+    root_logger = logging.getLogger()
+    handlers = list(root_logger.handlers)
+    listener = setup_logging(stream)
+    try:
+        logging.getLogger("jg.chick.test").warning(
+            "Thread %r not found", "Ahoj!", extra={"thread_id": 1}
+        )
+    finally:
+        listener.stop()
+        root_logger.handlers = handlers
+
+    assert stream.getvalue() == (
+        "WARNING:jg.chick.test:Thread 'Ahoj!' not found [thread_id=1]\n"
+    )
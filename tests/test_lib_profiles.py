@@ -0,0 +1,149 @@
+from datetime import timedelta
+from typing import cast
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from discord import Attachment
+
+from jg.chick.lib.profiles import (
+    ProfilesIndex,
+    ProfileURLs,
+    extract_profile_urls,
+    parse_usernames,
+)
+
+
+API_PAYLOAD = {
+    "items": [
+        {"github_username": "HonzaJavorek", "name": "Honza"},
+        {"github_username": "someone", "name": "Someone"},
+        {"github_username": None, "name": "Nobody"},
+    ]
+}
+
+
+class FakeAttachment:
+    def __init__(self, url: str, content_type: str):
+        self.url = url
+        self.content_type = content_type
+
+
+@pytest.fixture
+def create_api(create_json_api):
+    def factory(statuses: list[int]) -> tuple[web.Application, list[dict]]:
+        return create_json_api(
+            "/profiles.json", API_PAYLOAD, statuses, headers={"ETag": '"v1"'}
+        )
+
+    return factory
+
+
+def test_extract_profile_urls():
+    text = """
+        Ahoj, tady je můj GitHub https://github.com/HonzaJavorek/junior.guru
+        a ještě jednou github.com/honzajavorek, projekt github.com/juniorguru/chick.
+        LinkedIn: www.linkedin.com/in/petra-mičudová-0879a32a7
+        a znova https://www.linkedin.com/in/petra-mi%C4%8Dudov%C3%A1-0879a32a7/
+    """
+    attachments = [
+        FakeAttachment("https://cdn.example.com/cv.pdf", "application/pdf"),
+        FakeAttachment("https://cdn.example.com/photo.png", "image/png"),
+        FakeAttachment("https://cdn.example.com/cv.pdf", "application/pdf"),
+    ]
+
+    assert extract_profile_urls(
+        text, cast(list[Attachment], attachments)
+    ) == ProfileURLs(
+        github=(
+            "https://github.com/HonzaJavorek/",
+            "https://github.com/juniorguru/",
+        ),
+        linkedin=("https://www.linkedin.com/in/petra-mi%C4%8Dudov%C3%A1-0879a32a7/",),
+        cv=("https://cdn.example.com/cv.pdf",),
+    )
+
+
+def test_extract_profile_urls_finds_nothing():
+    profile_urls = extract_profile_urls("Ahoj, mrknete na moje CV?")
+
+    assert profile_urls == ProfileURLs()
+    assert not profile_urls
+
+
+def test_parse_usernames():
+    assert parse_usernames(API_PAYLOAD) == {"honzajavorek", "someone"}
+
+
+@pytest.mark.parametrize(
+    "username, expected",
+    [
+        ("honzajavorek", True),
+        ("HONZAJAVOREK", True),
+        ("someone", True),
+        ("someone-else", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_profiles_index_contains(username: str | None, expected: bool):
+    profiles = ProfilesIndex()
+    profiles.usernames = parse_usernames(API_PAYLOAD)
+
+    assert (username in profiles) is expected
+
+
+def test_profiles_index_is_stale_before_refresh():
+    assert ProfilesIndex().is_stale
+
+
+@pytest.mark.asyncio
+async def test_profiles_index_refresh(create_api):
+    app, _ = create_api([200])
+    async with TestServer(app) as server:
+        profiles = ProfilesIndex(str(server.make_url("/profiles.json")))
+
+        assert await profiles.refresh() is True
+        assert "HonzaJavorek" in profiles
+        assert not profiles.is_stale
+
+
+@pytest.mark.asyncio
+async def test_profiles_index_refresh_is_conditional(create_api):
+    app, requests = create_api([200, 304])
+    async with TestServer(app) as server:
+        profiles = ProfilesIndex(str(server.make_url("/profiles.json")))
+        await profiles.refresh()
+
+        assert await profiles.refresh() is True
+        assert requests[1]["If-None-Match"] == '"v1"'
+        assert len(profiles) == 2
+
+
+@pytest.mark.asyncio
+async def test_profiles_index_keeps_usernames_on_failure(create_api):
+    app, _ = create_api([200, 500])
+    async with TestServer(app) as server:
+        profiles = ProfilesIndex(
+            str(server.make_url("/profiles.json")), ttl=timedelta(0)
+        )
+        await profiles.refresh()
+
+        assert await profiles.refresh() is False
+        assert "someone" in profiles
+        assert profiles.is_stale
+
+
+@pytest.mark.asyncio
+async def test_profiles_index_keeps_usernames_on_invalid_payload():
+    async def profiles_json(request: web.Request) -> web.Response:
+        return web.Response(text="<html>", content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/profiles.json", profiles_json)
+    async with TestServer(app) as server:
+        profiles = ProfilesIndex(str(server.make_url("/profiles.json")))
+        profiles.usernames = parse_usernames(API_PAYLOAD)
+
+        assert await profiles.refresh() is False
+        assert "someone" in profiles
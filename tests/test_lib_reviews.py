@@ -1,6 +1,117 @@
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from discord import Embed, ForumChannel, Thread
+from jg.hen.models import Summary
+
+from jg.chick.lib import reviews
+from jg.chick.lib.reviews import (
+    REVIEW_TAGS_NAMES,
+    ForumTagsIndex,
+    GitHubRateBudget,
+    GitHubRateLimited,
+    ReviewQueue,
+    SummariesCache,
+    fetch_profile_version,
+    find_github_url,
+    find_linkedin_url,
+    find_missing_tags,
+    is_recheck_requested,
+    pack_messages,
+    prepare_tags,
+    review_github_profile,
+)
+
+
+class FakeSummary:
+    def __init__(self, error: str | None = None):
+        self.error = error
+
+
+class FakeTag:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FakeForumChannel:
+    def __init__(self, id: int, tags_names: list[str]):
+        self.id = id
+        self.name = "cv-github-linkedin"
+        self.available_tags = [FakeTag(name) for name in tags_names]
+
+
+class FakeThread:
+    def __init__(
+        self,
+        parent: FakeForumChannel | None = None,
+        applied_tags_names: list[str] | None = None,
+    ):
+        self.parent = parent
+        self.applied_tags = [FakeTag(name) for name in applied_tags_names or []]
+        self.sent = []
+
+    async def send(self, **kwargs):
+        self.sent.append(kwargs)
+
+
+def create_summary_messages(outcomes_count: int) -> list[dict]:
+    return [
+        dict(content="🔬 Tak jsem kouklo na ten GitHub."),
+        *[dict(embed=Embed(description=f"Outcome {i}")) for i in range(outcomes_count)],
+        dict(content="Hotovo! ✨"),
+        dict(content="Nevidím žádné zásadní nedostatky!"),
+        dict(content="Udělej Pull Request na github.com/…", suppress=True),
+    ]
+
+
+def create_github_api(remaining: int, reset: int) -> tuple[web.Application, list]:
+    requests = []
+
+    async def rate_limit(request: web.Request) -> web.Response:
+        requests.append(dict(request.headers))
+        core = {"limit": 5000, "remaining": remaining, "reset": reset}
+        return web.json_response({"resources": {"core": core}, "rate": core})
 
-from jg.chick.lib.reviews import find_github_url, find_linkedin_url
+    app = web.Application()
+    app.router.add_get("/rate_limit", rate_limit)
+    return app, requests
+
+
+def create_github_users_api(repos: list[dict]) -> tuple[web.Application, list]:
+    requests = []
+
+    async def user(request: web.Request) -> web.Response:
+        requests.append(request.path_qs)
+        return web.json_response({"login": "honzajavorek", "updated_at": "2024-01-01"})
+
+    async def user_repos(request: web.Request) -> web.Response:
+        requests.append(request.path_qs)
+        return web.json_response(repos)
+
+    app = web.Application()
+    app.router.add_get("/users/{username}", user)
+    app.router.add_get("/users/{username}/repos", user_repos)
+    return app, requests
+
+
+def create_versions(versions: list[str | None]):
+    async def fetch_profile_version(username: str, session=None) -> str | None:
+        return versions.pop(0)
+
+    return fetch_profile_version
+
+
+def create_checker(summaries: list[FakeSummary]):
+    checked_urls = []
+
+    async def check_profile_url(url: str, github_api_key: str | None = None):
+        checked_urls.append(url)
+        return cast(Summary, summaries.pop(0))
+
+    return check_profile_url, checked_urls
 
 
 @pytest.mark.parametrize(
@@ -101,3 +212,406 @@ def test_find_github_url(text: str, expected: str | None):
 )
 def test_find_linkedin_url(text: str, expected: str | None):
     assert find_linkedin_url(text) == expected
+
+
+def test_find_linkedin_url_finds_nothing():
+    assert find_linkedin_url("https://github.com/honzajavorek") is None
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_reuses_review(monkeypatch: pytest.MonkeyPatch):
+    summary = FakeSummary()
+    check_profile_url, checked_urls = create_checker([summary])
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1", "1"]))
+    summaries = SummariesCache()
+    await review_github_profile("https://github.com/HonzaJavorek/", summaries)
+
+    assert (
+        await review_github_profile("https://github.com/honzajavorek/", summaries)
+        is summary
+    )
+    assert checked_urls == ["https://github.com/HonzaJavorek/"]
+    assert (summaries.hits, summaries.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_recheck(monkeypatch: pytest.MonkeyPatch):
+    summary = FakeSummary()
+    check_profile_url, checked_urls = create_checker([FakeSummary(), summary])
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1", "1"]))
+    summaries = SummariesCache()
+    await review_github_profile("https://github.com/honzajavorek/", summaries)
+
+    assert (
+        await review_github_profile(
+            "https://github.com/honzajavorek/", summaries, recheck=True
+        )
+        is summary
+    )
+    assert len(checked_urls) == 2
+    assert summaries.get("honzajavorek") == (summary, "1")
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_rechecks_changed_profile(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    summary = FakeSummary()
+    check_profile_url, checked_urls = create_checker([FakeSummary(), summary])
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1", "2"]))
+    summaries = SummariesCache()
+    await review_github_profile("https://github.com/honzajavorek/", summaries)
+
+    assert (
+        await review_github_profile("https://github.com/honzajavorek/", summaries)
+        is summary
+    )
+    assert len(checked_urls) == 2
+    assert summaries.get("honzajavorek") == (summary, "2")
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_reuses_review_if_version_unknown(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    summary = FakeSummary()
+    check_profile_url, checked_urls = create_checker([summary])
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1", None]))
+    summaries = SummariesCache()
+    await review_github_profile("https://github.com/honzajavorek/", summaries)
+
+    assert (
+        await review_github_profile("https://github.com/honzajavorek/", summaries)
+        is summary
+    )
+    assert len(checked_urls) == 1
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_doesnt_cache_errors(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    check_profile_url, checked_urls = create_checker(
+        [FakeSummary(error="Rate limited"), FakeSummary()]
+    )
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1", "1"]))
+    summaries = SummariesCache()
+    await review_github_profile("https://github.com/honzajavorek/", summaries)
+    await review_github_profile("https://github.com/honzajavorek/", summaries)
+
+    assert len(checked_urls) == 2
+
+
+@pytest.mark.asyncio
+async def test_review_queue_runs_jobs():
+    done = []
+
+    async def job():
+        done.append(True)
+
+    queue = ReviewQueue(workers=2)
+    queue.start()
+    try:
+        assert queue.submit(job)
+        assert queue.submit(job)
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert done == [True, True]
+    assert queue.processed == 2
+
+
+@pytest.mark.asyncio
+async def test_review_queue_refuses_jobs_when_full():
+    async def job():
+        pass
+
+    queue = ReviewQueue(maxsize=1)
+
+    assert queue.submit(job)
+    assert not queue.submit(job)
+    assert len(queue) == 1
+
+
+@pytest.mark.asyncio
+async def test_review_queue_survives_failing_job():
+    done = []
+
+    async def failing_job():
+        raise RuntimeError("GitHub is down")
+
+    async def job():
+        done.append(True)
+
+    queue = ReviewQueue(workers=1)
+    queue.start()
+    try:
+        queue.submit(failing_job)
+        queue.submit(job)
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert done == [True]
+    assert not queue.is_running
+
+
+@pytest.mark.asyncio
+async def test_pack_messages_saves_api_calls():
+    messages = create_summary_messages(12)
+    thread = FakeThread()
+    for message in messages:
+        await thread.send(**message)
+    packed_thread = FakeThread()
+    for message in pack_messages(messages):
+        await packed_thread.send(**message)
+
+    assert len(thread.sent) == 16
+    assert len(packed_thread.sent) == 4
+
+
+def test_pack_messages_keeps_order_and_content():
+    messages = create_summary_messages(12)
+    packed = list(pack_messages(messages))
+
+    assert [message.get("content") for message in packed] == [
+        "🔬 Tak jsem kouklo na ten GitHub.",
+        None,
+        "Hotovo! ✨\n\nNevidím žádné zásadní nedostatky!",
+        "Udělej Pull Request na github.com/…",
+    ]
+    assert [
+        embed.description for embed in packed[0]["embeds"] + packed[1]["embeds"]
+    ] == [f"Outcome {i}" for i in range(12)]
+    assert packed[3]["suppress"] is True
+
+
+def test_pack_messages_respects_embeds_length_limit():
+    messages = [dict(embed=Embed(description="x" * 4000)) for _ in range(2)]
+
+    assert len(list(pack_messages(messages))) == 2
+
+
+def test_pack_messages_respects_content_limit():
+    messages = [dict(content="x" * 1500) for _ in range(2)]
+
+    assert len(list(pack_messages(messages))) == 2
+
+
+def test_pack_messages_starts_new_message_with_content_after_embeds():
+    messages = [dict(embed=Embed(description="Outcome")), dict(content="Hotovo!")]
+
+    assert len(list(pack_messages(messages))) == 2
+
+
+@pytest.mark.asyncio
+async def test_github_rate_budget_grants_review():
+    reset = int(datetime.now(UTC).timestamp()) + 3600
+    app, requests = create_github_api(remaining=4000, reset=reset)
+    async with TestServer(app) as server:
+        budget = GitHubRateBudget(
+            str(server.make_url("")).rstrip("/"), github_api_key="secret"
+        )
+
+        assert await budget.reserve() is None
+        assert budget.remaining == 4000 - budget.review_cost
+        assert requests[0]["Authorization"] == "Bearer secret"
+
+
+@pytest.mark.asyncio
+async def test_github_rate_budget_defers_review_until_reset():
+    reset = int(datetime.now(UTC).timestamp()) + 3600
+    app, _ = create_github_api(remaining=10, reset=reset)
+    async with TestServer(app) as server:
+        budget = GitHubRateBudget(str(server.make_url("")).rstrip("/"))
+
+        assert await budget.reserve() == datetime.fromtimestamp(reset, UTC)
+
+
+@pytest.mark.asyncio
+async def test_github_rate_budget_subtracts_reviews_between_checks():
+    reset = int(datetime.now(UTC).timestamp()) + 3600
+    app, requests = create_github_api(remaining=50, reset=reset)
+    async with TestServer(app) as server:
+        budget = GitHubRateBudget(str(server.make_url("")).rstrip("/"), review_cost=30)
+
+        assert await budget.reserve() is None
+        assert await budget.reserve() is not None
+        assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_github_rate_budget_grants_review_if_check_fails():
+    async with TestServer(web.Application()) as server:
+        budget = GitHubRateBudget(str(server.make_url("")).rstrip("/"))
+
+        assert await budget.reserve() is None
+
+
+@pytest.mark.asyncio
+async def test_review_queue_submits_later():
+    done = []
+
+    async def job():
+        done.append(True)
+
+    queue = ReviewQueue(workers=1)
+    queue.start()
+    try:
+        queue.submit_later(job, timedelta(0))
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert done == [True]
+
+
+def test_prepare_tags():
+    thread = FakeThread(FakeForumChannel(1, REVIEW_TAGS_NAMES), ["nové"])
+
+    assert {
+        tag.name for tag in prepare_tags(cast(Thread, thread), cv=True, linkedin=True)
+    } == {"nové", "zpětná vazba na CV", "zpětná vazba na LI"}
+
+
+def test_prepare_tags_skips_missing_tag():
+    thread = FakeThread(FakeForumChannel(1, ["zpětná vazba na CV"]))
+
+    assert [
+        tag.name for tag in prepare_tags(cast(Thread, thread), cv=True, github=True)
+    ] == ["zpětná vazba na CV"]
+
+
+def test_prepare_tags_uses_index():
+    channel = FakeForumChannel(1, REVIEW_TAGS_NAMES)
+    forum_tags = ForumTagsIndex()
+    forum_tags.get(cast(ForumChannel, channel))
+    channel.available_tags = []
+
+    assert prepare_tags(
+        cast(Thread, FakeThread(channel)), github=True, forum_tags=forum_tags
+    )
+
+
+def test_forum_tags_index_forget():
+    channel = FakeForumChannel(1, REVIEW_TAGS_NAMES)
+    forum_tags = ForumTagsIndex()
+    forum_tags.get(cast(ForumChannel, channel))
+    channel.available_tags = []
+    forum_tags.forget(1)
+
+    assert forum_tags.get(cast(ForumChannel, channel)) == {}
+
+
+def test_find_missing_tags():
+    channel = FakeForumChannel(1, ["zpětná vazba na CV", "nové"])
+
+    assert find_missing_tags(cast(ForumChannel, channel)) == [
+        "zpětná vazba na GH",
+        "zpětná vazba na LI",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_profile_version():
+    app, requests = create_github_users_api([{"pushed_at": "2024-02-02"}])
+    async with TestServer(app) as server:
+        github_api_url = str(server.make_url("")).rstrip("/")
+
+        assert (
+            await fetch_profile_version("honzajavorek", github_api_url=github_api_url)
+            == "2024-01-01/2024-02-02"
+        )
+        assert requests == [
+            "/users/honzajavorek",
+            "/users/honzajavorek/repos?sort=pushed&per_page=1",
+        ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_profile_version_without_repos():
+    app, _ = create_github_users_api([])
+    async with TestServer(app) as server:
+        github_api_url = str(server.make_url("")).rstrip("/")
+
+        assert (
+            await fetch_profile_version("honzajavorek", github_api_url=github_api_url)
+            == "2024-01-01/"
+        )
+
+
+@pytest.mark.asyncio
+async def test_fetch_profile_version_unknown():
+    async with TestServer(web.Application()) as server:
+        github_api_url = str(server.make_url("")).rstrip("/")
+
+        assert (
+            await fetch_profile_version("honzajavorek", github_api_url=github_api_url)
+            is None
+        )
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("<@123> mrkni na to", False),
+        ("<@123> mrkni na to znovu, opravila jsem to", True),
+        ("<@123> Recheck please", True),
+    ],
+)
+def test_is_recheck_requested(text: str, expected: bool):
+    assert is_recheck_requested(text) is expected
+
+
+def create_low_budget() -> GitHubRateBudget:
+    github_budget = GitHubRateBudget()
+    reset = int(datetime.now(UTC).timestamp()) + 3600
+    github_budget.record(remaining=10, reset=reset)
+    return github_budget
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_reuses_review_on_low_budget(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    summary = FakeSummary()
+    check_profile_url, checked_urls = create_checker([summary])
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1", "1"]))
+    summaries = SummariesCache()
+    await review_github_profile("https://github.com/honzajavorek/", summaries)
+
+    assert (
+        await review_github_profile(
+            "https://github.com/honzajavorek/",
+            summaries,
+            github_budget=create_low_budget(),
+        )
+        is summary
+    )
+    assert len(checked_urls) == 1
+
+
+@pytest.mark.asyncio
+async def test_review_github_profile_raises_on_low_budget(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    check_profile_url, checked_urls = create_checker([FakeSummary()])
+    monkeypatch.setattr(reviews, "check_profile_url", check_profile_url)
+    monkeypatch.setattr(reviews, "fetch_profile_version", create_versions(["1"]))
+    github_budget = create_low_budget()
+
+    with pytest.raises(GitHubRateLimited) as exc_info:
+        await review_github_profile(
+            "https://github.com/honzajavorek/",
+            SummariesCache(),
+            github_budget=github_budget,
+        )
+    assert exc_info.value.reset_at == github_budget.reset_at
+    assert checked_urls == []
@@ -0,0 +1,99 @@
+from typing import cast
+
+import discord
+
+from jg.chick.lib.roles import RoleMembersIndex
+
+
+class Role:
+    def __init__(self, id: int, members: list["Member"] | None = None):
+        self.id = id
+        self.members = members or []
+
+    def is_default(self) -> bool:
+        return self.id == 1
+
+
+class Member:
+    def __init__(self, id: int, roles: list[Role], guild: "Guild | None" = None):
+        self.id = id
+        self.roles = roles
+        self.guild = guild
+
+
+class Guild:
+    def __init__(self, id: int, roles: list[Role], members: list[Member]):
+        self.id = id
+        self.roles = roles
+        self.members = members
+        for member in members:
+            member.guild = self
+
+    def get_member(self, member_id: int) -> Member | None:
+        for member in self.members:
+            if member.id == member_id:
+                return member
+        return None
+
+
+EVERYONE = Role(1)
+PYTHON = Role(100)
+JAVA = Role(200)
+
+
+def create_guild() -> Guild:
+    return Guild(
+        1,
+        [EVERYONE, PYTHON, JAVA],
+        [
+            Member(10, [EVERYONE, PYTHON]),
+            Member(20, [EVERYONE, PYTHON, JAVA]),
+            Member(30, [EVERYONE]),
+        ],
+    )
+
+
+def get_members_ids(index: RoleMembersIndex, guild: Guild, role: Role) -> set[int]:
+    members = index.get_members(cast(discord.Guild, guild), cast(discord.Role, role))
+    return {member.id for member in members}
+
+
+def test_role_members_index():
+    guild = create_guild()
+    index = RoleMembersIndex()
+    index.index_guild(cast(discord.Guild, guild))
+
+    assert get_members_ids(index, guild, PYTHON) == {10, 20}
+    assert get_members_ids(index, guild, JAVA) == {20}
+
+
+def test_role_members_index_follows_member_updates():
+    guild = create_guild()
+    index = RoleMembersIndex()
+    index.index_guild(cast(discord.Guild, guild))
+    before = cast(discord.Member, guild.members[2])
+    after = Member(30, [EVERYONE, JAVA], guild)
+    guild.members[2] = after
+    index.update_member(before, cast(discord.Member, after))
+
+    assert get_members_ids(index, guild, JAVA) == {20, 30}
+
+
+def test_role_members_index_follows_joins_and_leaves():
+    guild = create_guild()
+    index = RoleMembersIndex()
+    index.index_guild(cast(discord.Guild, guild))
+    newcomer = Member(40, [EVERYONE, PYTHON], guild)
+    guild.members.append(newcomer)
+    index.add_member(cast(discord.Member, newcomer))
+    index.remove_member(cast(discord.Member, guild.members[0]))
+
+    assert get_members_ids(index, guild, PYTHON) == {20, 40}
+
+
+def test_role_members_index_falls_back_for_unknown_guild():
+    guild = create_guild()
+    role = Role(100, members=[guild.members[0]])
+    index = RoleMembersIndex()
+
+    assert get_members_ids(index, guild, role) == {10}
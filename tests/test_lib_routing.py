@@ -0,0 +1,89 @@
+from typing import cast
+
+import discord
+
+from jg.chick.lib.routing import ChannelRoutes
+
+
+class FakeChannel:
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+
+class FakeGuild:
+    def __init__(self, channels: list[FakeChannel]):
+        self.channels = channels
+
+
+async def handle_intro(message: discord.Message):
+    pass
+
+
+async def handle_trap(message: discord.Message):
+    pass
+
+
+def create_routes() -> ChannelRoutes:
+    routes = ChannelRoutes()
+    routes.route("ahoj")(handle_intro)
+    routes.route("past-vedle-pasti")(handle_trap)
+    return routes
+
+
+def test_route_returns_handler():
+    routes = ChannelRoutes()
+
+    assert routes.route("ahoj")(handle_intro) is handle_intro
+
+
+def test_index_guild():
+    routes = create_routes()
+    guild = FakeGuild(
+        [
+            FakeChannel(1, "ahoj"),
+            FakeChannel(2, "past-vedle-pasti"),
+            FakeChannel(3, "off-topic"),
+        ]
+    )
+    routes.index_guild(cast(discord.Guild, guild))
+
+    assert routes.get(1) is handle_intro
+    assert routes.get(2) is handle_trap
+    assert routes.get(3) is None
+    assert len(routes) == 2
+
+
+def test_add_channel():
+    routes = create_routes()
+    routes.add_channel(cast(discord.abc.GuildChannel, FakeChannel(1, "ahoj")))
+
+    assert routes.get(1) is handle_intro
+
+
+def test_update_channel_renamed():
+    routes = create_routes()
+    channel = FakeChannel(1, "ahoj")
+    routes.add_channel(cast(discord.abc.GuildChannel, channel))
+    channel.name = "ahoj-archiv"
+    routes.update_channel(cast(discord.abc.GuildChannel, channel))
+
+    assert routes.get(1) is None
+
+
+def test_update_channel_renamed_to_routed_name():
+    routes = create_routes()
+    routes.update_channel(
+        cast(discord.abc.GuildChannel, FakeChannel(1, "past-vedle-pasti"))
+    )
+
+    assert routes.get(1) is handle_trap
+
+
+def test_remove_channel():
+    routes = create_routes()
+    routes.add_channel(cast(discord.abc.GuildChannel, FakeChannel(1, "ahoj")))
+    routes.remove_channel(1)
+    routes.remove_channel(2)
+
+    assert routes.get(1) is None
@@ -1,12 +1,15 @@
+import re
 from datetime import datetime
 from typing import cast
 
 import discord
 import pytest
 
-from jg.chick.lib.threads import name_thread
+from jg.chick.lib.threads import name_thread, parse_bracket_content
 
 
+BRACKETS_RE = re.compile(r"^\[(?P<bracket_content>.*[^\s][^\]])\]")
+
 DAYS = ["Pondělní", "Úterní", "Středeční", "Čtvrteční", "Páteční", "Sobotní", "Nedělní"]
 
 
@@ -88,3 +91,49 @@ def test_parse_message_in_brackets(content: str, expected_name: str):
         name_thread(message, name_template, bracket_name_template=bracket_name_template)
         == expected_name
     )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "[eslint, nextjs]",
+        "[ Java ]",
+        "[a]",
+        "[ab]",
+        "[a ]",
+        "[ab]]",
+        "[ab] [cd] text",
+        "[ab]x]",
+        "[ab\n] text",
+        "[ab\ncd] text",
+        "[ab] text\n[cd] text",
+        "[[ab]]",
+        "[",
+        "[]",
+        "]",
+        "",
+    ],
+)
+def test_parse_bracket_content_same_as_regex(content: str):
+    match = BRACKETS_RE.match(content)
+
+    assert parse_bracket_content(content) == (
+        match.group("bracket_content") if match else None
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param("[" + "a" * 4000, id="not closed"),
+        pytest.param("[" + "]" * 4000, id="only closing brackets"),
+        pytest.param("[" + "a " * 2000 + "]", id="whitespace before closing"),
+    ],
+)
+def test_parse_bracket_content_pathological(content: str):
+    assert parse_bracket_content(content) is None
+
+
+def test_parse_bracket_content_too_long():
+    assert parse_bracket_content("[" + "a" * 101 + "]") is None
+    assert parse_bracket_content("[" + "a" * 100 + "]") == "a" * 100
@@ -0,0 +1,270 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
+import discord
+import pytest
+
+from jg.chick.lib.threads import (
+    BotMessages,
+    RolePings,
+    StartingMessagesCache,
+    ThreadMembersCache,
+    clear_bot_messages,
+    fetch_starting_message,
+)
+
+
+class ThreadMember:
+    def __init__(self, id: int):
+        self.id = id
+
+
+class Message:
+    def __init__(self, thread: "Thread", content: str, id: int | None = None):
+        self.thread = thread
+        self.content = content
+        self.id = len(thread.sent_messages) if id is None else id
+
+    async def delete(self, reason: str | None = None) -> None:
+        self.thread.deleted_messages.append(self)
+
+
+class Thread:
+    def __init__(self, id: int, members_ids: list[int], member_count: int | None):
+        self.id = id
+        self.members_ids = members_ids
+        self.member_count = member_count
+        self.name = f"Thread #{id}"
+        self.starting_message = None
+        self.sent_messages: list[Message] = []
+        self.deleted_messages: list[Message] = []
+        self.bulk_deleted_messages_ids: list[list[int]] = []
+        self.fetch_members_calls = 0
+        self.fetch_message_calls = 0
+
+    async def fetch_members(self) -> list[ThreadMember]:
+        self.fetch_members_calls += 1
+        return [ThreadMember(member_id) for member_id in self.members_ids]
+
+    async def send(self, content: str, silent: bool = False) -> Message:
+        message = Message(self, content)
+        self.sent_messages.append(message)
+        return message
+
+    async def delete_messages(
+        self, messages: list[discord.Object], reason: str | None = None
+    ) -> None:
+        self.bulk_deleted_messages_ids.append([message.id for message in messages])
+
+    def get_partial_message(self, message_id: int) -> Message:
+        return Message(self, "", id=message_id)
+
+    async def fetch_message(self, message_id: int) -> str:
+        self.fetch_message_calls += 1
+        await asyncio.sleep(0)
+        return f"message #{message_id}"
+
+
+@pytest.mark.asyncio
+async def test_thread_members_cache_fetches_once():
+    thread = Thread(1, [10, 20], member_count=2)
+    cache = ThreadMembersCache()
+    await cache.get(cast(discord.Thread, thread))
+    members_ids = await cache.get(cast(discord.Thread, thread))
+
+    assert members_ids == {10, 20}
+    assert thread.fetch_members_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_thread_members_cache_follows_events():
+    thread = Thread(1, [10, 20], member_count=2)
+    cache = ThreadMembersCache()
+    await cache.get(cast(discord.Thread, thread))
+    cache.add(1, 30)
+    cache.remove(1, 10)
+    members_ids = await cache.get(cast(discord.Thread, thread))
+
+    assert members_ids == {20, 30}
+    assert thread.fetch_members_calls == 1
+
+
+def test_thread_members_cache_ignores_events_of_unknown_threads():
+    cache = ThreadMembersCache()
+    cache.add(1, 30)
+    cache.remove(1, 10)
+
+    assert 1 not in cache
+
+
+@pytest.mark.asyncio
+async def test_thread_members_cache_refetches_on_inconsistent_member_count():
+    thread = Thread(1, [10, 20], member_count=2)
+    cache = ThreadMembersCache()
+    await cache.get(cast(discord.Thread, thread))
+    thread.members_ids = [10, 20, 30]
+    thread.member_count = 3
+    members_ids = await cache.get(cast(discord.Thread, thread))
+
+    assert members_ids == {10, 20, 30}
+    assert thread.fetch_members_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_thread_members_cache_trusts_stale_member_count():
+    thread = Thread(1, [10, 20], member_count=5)
+    cache = ThreadMembersCache()
+    await cache.get(cast(discord.Thread, thread))
+    await cache.get(cast(discord.Thread, thread))
+
+    assert thread.fetch_members_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_thread_members_cache_forget():
+    thread = Thread(1, [10, 20], member_count=2)
+    cache = ThreadMembersCache()
+    await cache.get(cast(discord.Thread, thread))
+    cache.forget(1)
+    await cache.get(cast(discord.Thread, thread))
+
+    assert thread.fetch_members_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_starting_message_merges_concurrent_requests():
+    thread = Thread(1, [], member_count=0)
+    cache = StartingMessagesCache()
+    messages = await asyncio.gather(
+        *[fetch_starting_message(cast(discord.Thread, thread), cache) for _ in range(5)]
+    )
+
+    assert messages == ["message #1"] * 5
+    assert thread.fetch_message_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_starting_message_caches():
+    thread = Thread(1, [], member_count=0)
+    cache = StartingMessagesCache()
+    await fetch_starting_message(cast(discord.Thread, thread), cache)
+    await fetch_starting_message(cast(discord.Thread, thread), cache)
+
+    assert thread.fetch_message_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_starting_message_forget():
+    thread = Thread(1, [], member_count=0)
+    cache = StartingMessagesCache()
+    await fetch_starting_message(cast(discord.Thread, thread), cache)
+    cache.forget(1)
+    await fetch_starting_message(cast(discord.Thread, thread), cache)
+
+    assert thread.fetch_message_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_starting_message_forget_while_fetching():
+    thread = Thread(1, [], member_count=0)
+    cache = StartingMessagesCache()
+    task = asyncio.create_task(
+        fetch_starting_message(cast(discord.Thread, thread), cache)
+    )
+    await asyncio.sleep(0)
+    cache.forget(1)
+    await task
+    await fetch_starting_message(cast(discord.Thread, thread), cache)
+
+    assert thread.fetch_message_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_starting_message_prefers_discord_cache():
+    thread = Thread(1, [], member_count=0)
+    thread.starting_message = "cached message"
+    message = await fetch_starting_message(
+        cast(discord.Thread, thread), StartingMessagesCache()
+    )
+
+    assert message == "cached message"
+    assert thread.fetch_message_calls == 0
+
+
+@pytest.mark.asyncio
+async def test_role_pings_coalesces_same_role_in_same_thread():
+    thread = Thread(1, [], member_count=0)
+    role_pings = RolePings()
+    await role_pings.ping(cast(discord.Thread, thread), 42)
+    await role_pings.ping(cast(discord.Thread, thread), 42)
+    await asyncio.sleep(0)
+
+    assert [m.content for m in thread.sent_messages] == ["<@&42>"]
+    assert thread.deleted_messages == thread.sent_messages
+    assert role_pings.saved_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_role_pings_keeps_different_roles_and_threads_apart():
+    thread1 = Thread(1, [], member_count=0)
+    thread2 = Thread(2, [], member_count=0)
+    role_pings = RolePings()
+    await role_pings.ping(cast(discord.Thread, thread1), 42)
+    await role_pings.ping(cast(discord.Thread, thread1), 43)
+    await role_pings.ping(cast(discord.Thread, thread2), 42)
+
+    assert [m.content for m in thread1.sent_messages] == ["<@&42>", "<@&43>"]
+    assert [m.content for m in thread2.sent_messages] == ["<@&42>"]
+    assert role_pings.saved_calls == 0
+
+
+@pytest.mark.asyncio
+async def test_role_pings_pings_again_after_window():
+    thread = Thread(1, [], member_count=0)
+    role_pings = RolePings(window=timedelta(0))
+    await role_pings.ping(cast(discord.Thread, thread), 42)
+    await role_pings.ping(cast(discord.Thread, thread), 42)
+
+    assert len(thread.sent_messages) == 2
+
+
+def test_bot_messages_keeps_purposes_apart():
+    bot_messages = BotMessages()
+    bot_messages.record(1, "interest notification", 100)
+    bot_messages.record(1, "interest notification", 101)
+    bot_messages.record(1, "something else", 102)
+    bot_messages.record(2, "interest notification", 103)
+
+    assert bot_messages.pop(1, "interest notification") == [100, 101]
+    assert bot_messages.pop(1, "interest notification") == []
+
+
+def test_bot_messages_keeps_only_recent():
+    bot_messages = BotMessages(limit_count=2)
+    for message_id in range(5):
+        bot_messages.record(1, "interest notification", message_id)
+
+    assert bot_messages.pop(1, "interest notification") == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_clear_bot_messages():
+    now = datetime.now(UTC)
+    recent_ids = [
+        discord.utils.time_snowflake(now - timedelta(days=1)),
+        discord.utils.time_snowflake(now - timedelta(days=2)),
+    ]
+    old_id = discord.utils.time_snowflake(now - timedelta(days=30))
+    thread = Thread(1, [], member_count=0)
+    bot_messages = BotMessages()
+    for message_id in [*recent_ids, old_id]:
+        bot_messages.record(1, "interest notification", message_id)
+    bot_messages.record(1, "something else", 42)
+    await clear_bot_messages(
+        cast(discord.Thread, thread), bot_messages, "interest notification", now=now
+    )
+
+    assert thread.bulk_deleted_messages_ids == [recent_ids]
+    assert [message.id for message in thread.deleted_messages] == [old_id]
+    assert bot_messages.pop(1, "something else") == [42]
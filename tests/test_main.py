@@ -0,0 +1,38 @@
+import asyncio
+import json
+import logging
+import signal
+from pathlib import Path
+
+import pytest
+
+from jg.chick import main as main_module
+from jg.chick.bot import ChickBot
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    root_handlers = logging.getLogger().handlers[:]
+    yield loop
+    logging.getLogger().handlers[:] = root_handlers
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_main_saves_snapshot_on_sigint(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, loop
+):
+    async def run(bot: ChickBot, host, port, discord_api_key) -> None:
+        bot.interests = {1: {"role_id": 100, "last_notified_at": None}}
+        signal.raise_signal(signal.SIGINT)
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(main_module, "run", run)
+    path = tmp_path / "snapshot.json"
+    main_module.main(["--snapshot-path", str(path)], standalone_mode=False)
+
+    assert json.loads(path.read_text()) == {
+        "1": {"role_id": 100, "last_notified_at": None}
+    }